@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+
+from table_index import FrameRegistry, filter_positions, get_index, take_rows
+
+
+class AggregateCube:
+    """
+    Precomputed sums and non-missing counts of every measure of a table:
+    overall, per dimension value and per pair of values from two dimension
+    columns. Means for "overall average" and marginal filters then come from
+    a lookup instead of a scan.
+
+    Missing measure cells are excluded like in Series.mean(). Sums are
+    accumulated in a different order than pandas, so a mean can differ from
+    it in the last bits; check_cube compares the rounded answers.
+    """
+
+    def __init__(self, df=None, index=None):
+        # measure -> (sum, count)
+        self._overall = {}
+        # column -> (measure -> (sums, counts) indexed by value id)
+        self._marginals = {}
+        # (column a, column b) -> (sorted pair keys, size of b, measure -> (sums, counts))
+        self._pairs = {}
+        self._index = index
+        if df is None:
+            return
+
+        index = index or get_index(df)
+        self._index = index
+        dims = [c for c in df.columns if c in index]
+        measures = [c for c in df.columns if c not in index and pd.api.types.is_numeric_dtype(df[c])]
+
+        values = {}
+        valid = {}
+        for m in measures:
+            v = np.asarray(df[m], dtype=np.float64)
+            ok = ~np.isnan(v)
+            values[m] = np.where(ok, v, 0.0)
+            valid[m] = ok
+            self._overall[m] = (float(values[m].sum()), int(ok.sum()))
+
+        ids = {c: index.row_ids(c) for c in dims}
+        sizes = {c: len(index.values(c)) for c in dims}
+
+        for c in dims:
+            present = ids[c] >= 0
+            slots = ids[c][present]
+            self._marginals[c] = {
+                m: self._bincount(slots, values[m][present], valid[m][present], sizes[c])
+                for m in measures
+            }
+
+        for i, a in enumerate(dims):
+            for b in dims[i + 1:]:
+                present = (ids[a] >= 0) & (ids[b] >= 0)
+                keys = ids[a][present] * sizes[b] + ids[b][present]
+                pair_keys, slots = np.unique(keys, return_inverse=True)
+                self._pairs[(a, b)] = (pair_keys, sizes[b], {
+                    m: self._bincount(slots, values[m][present], valid[m][present], len(pair_keys))
+                    for m in measures
+                })
+
+    @staticmethod
+    def _bincount(slots, values, valid, size):
+        sums = np.bincount(slots, weights=values, minlength=size)
+        counts = np.bincount(slots, weights=valid, minlength=size).astype(np.int64)
+        return sums, counts
+
+    def measures(self):
+        return list(self._overall)
+
+    def stats(self, measure, filters=None):
+        """
+        (sum, count) of `measure` over the rows matching `filters`
+        ({column: value}, at most two columns), or None when the
+        combination is not covered by the cube.
+        """
+        if measure not in self._overall:
+            return None
+
+        filters = dict(filters or {})
+        if not filters:
+            return self._overall[measure]
+
+        if len(filters) == 1:
+            (col, value), = filters.items()
+            if col not in self._marginals:
+                return None
+            vid = self._index.value_id(col, value)
+            if vid < 0:
+                return 0.0, 0
+            sums, counts = self._marginals[col][measure]
+            return float(sums[vid]), int(counts[vid])
+
+        if len(filters) == 2:
+            (a, va), (b, vb) = filters.items()
+            if (a, b) not in self._pairs:
+                a, va, b, vb = b, vb, a, va
+            if (a, b) not in self._pairs:
+                return None
+            ia, ib = self._index.value_id(a, va), self._index.value_id(b, vb)
+            if ia < 0 or ib < 0:
+                return 0.0, 0
+            pair_keys, size_b, per_measure = self._pairs[(a, b)]
+            key = ia * size_b + ib
+            slot = np.searchsorted(pair_keys, key)
+            if slot >= len(pair_keys) or pair_keys[slot] != key:
+                return 0.0, 0
+            sums, counts = per_measure[measure]
+            return float(sums[slot]), int(counts[slot])
+
+        return None
+
+    def mean(self, measure, filters=None):
+        """
+        Mean of `measure` over the matching rows (NaN if none has a value),
+        or None when the cube cannot answer.
+        """
+        stats = self.stats(measure, filters)
+        if stats is None:
+            return None
+        total, count = stats
+        # np.float64 like Series.mean(), whose round() differs from float's at .5
+        return np.float64(total) / count if count else np.float64("nan")
+
+    def marginal_means(self, col, measure):
+        """
+        Means of `measure` for every value of `col`, aligned with
+        ValueIndex.values(col); NaN where no row has a value.
+        """
+        sums, counts = self._marginals[col][measure]
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    def renamed(self, mapping, index=None):
+        """
+        Same cube under different column names (used for mirrored tables).
+        """
+        out = AggregateCube()
+        out._index = index
+        out._overall = self._overall
+        out._marginals = {mapping.get(c, c): m for c, m in self._marginals.items()}
+        out._pairs = {(mapping.get(a, a), mapping.get(b, b)): p for (a, b), p in self._pairs.items()}
+        return out
+
+
+_CUBES = FrameRegistry(AggregateCube)
+
+
+def get_cube(df):
+    """
+    Returns the AggregateCube of a table, building it on first use.
+    """
+    return _CUBES.get(df)
+
+
+def register_cube(df, cube):
+    _CUBES.register(df, cube)
+
+
+def check_cube(df, cube=None, decimals=2, max_pairs=200):
+    """
+    Compares cube means with pandas on the same table: overall, every single
+    value and up to `max_pairs` value pairs per column pair.
+    Returns a list of (filters, measure, pandas mean, cube mean) mismatches
+    after rounding to `decimals`, empty when consistent.
+    """
+    cube = cube or get_cube(df)
+    index = get_index(df)
+    dims = [c for c in df.columns if c in index]
+
+    checks = [{}]
+    for c in dims:
+        checks.extend({c: v} for v in index.values(c))
+    for i, a in enumerate(dims):
+        for b in dims[i + 1:]:
+            pairs = df[[a, b]].dropna().drop_duplicates().head(max_pairs)
+            checks.extend({a: str(va), b: str(vb)} for va, vb in pairs.itertuples(index=False))
+
+    mismatches = []
+    for filters in checks:
+        positions = None
+        for col, value in filters.items():
+            positions = filter_positions(index, col, value, positions)
+        subset = take_rows(df, positions)
+
+        for m in cube.measures():
+            expected = round(subset[m].mean(), decimals)
+            actual = round(cube.mean(m, filters), decimals)
+            if not (expected == actual or (np.isnan(expected) and np.isnan(actual))):
+                mismatches.append((filters, m, expected, actual))
+
+    return mismatches
+
+
+def check_marginals(df, cube=None, decimals=2):
+    """
+    Compares cube.marginal_means with a pandas groupby mean for every
+    dimension column and measure. Returns a list of (column, value, measure,
+    pandas mean, cube mean) mismatches after rounding, empty when consistent.
+    """
+    cube = cube or get_cube(df)
+    index = get_index(df)
+
+    mismatches = []
+    for col in [c for c in df.columns if c in index]:
+        values = index.values(col)
+        for m in cube.measures():
+            means = df.groupby(col, sort=False, observed=True)[m].mean().reindex(values)
+            expected = np.round(np.asarray(means, dtype=np.float64), decimals)
+            actual = np.round(cube.marginal_means(col, m), decimals)
+            for value, e, a in zip(values, expected, actual):
+                if not (e == a or (np.isnan(e) and np.isnan(a))):
+                    mismatches.append((col, value, m, e, a))
+
+    return mismatches
@@ -0,0 +1,67 @@
+import hashlib
+import json
+
+import plotly.io as pio
+
+from data_loader import get_dataset
+from figure_cache import FIGURE_CACHE
+from ranking import ranking_frame
+from trends import trend_frame
+from visualizations import plot_cached, plot_ranking, plot_trend
+
+# Intent fields a chart depends on
+INTENT_FIELDS = ("dimensions", "year", "metric", "filter_values", "ranking")
+
+
+def chart_spec(kind, version, table=None, measure=None, chart=None, intent=None):
+    """
+    JSON-serializable description of a chart, enough to rebuild it:
+    kind is "generic" (plot_generic), "trend" or "ranking".
+    """
+    spec = {"kind": kind, "version": version, "table": table, "measure": measure, "chart": chart}
+    if intent is not None:
+        spec["intent"] = {k: intent.get(k) for k in INTENT_FIELDS}
+    return spec
+
+
+def _table(dataset, table):
+    return dataset.tables_2d[table] if "_x_" in table else dataset.tables_1d[table]
+
+
+def render_chart(spec, cache=FIGURE_CACHE):
+    """
+    Builds (or fetches) the figure of a spec. Returns (cache key, figure).
+    """
+    dataset = get_dataset(spec["version"])
+    version = dataset.version
+
+    if spec["kind"] == "generic":
+        return plot_cached(_table(dataset, spec["table"]), spec["measure"], spec["chart"], version, spec["table"], cache)
+
+    raw = json.dumps(spec, sort_keys=True) + dataset.signature
+    key = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    payload = cache.get(key)
+    if payload is not None:
+        return key, pio.from_json(payload)
+
+    intent = spec["intent"]
+    if spec["kind"] == "trend":
+        fig = plot_trend(trend_frame(_table(dataset, spec["table"]), intent, version), intent["metric"])
+    elif spec["kind"] == "ranking":
+        fig = plot_ranking(*ranking_frame(dataset.tables_1d, dataset.tables_2d, intent, version))
+    else:
+        raise ValueError(f"Unknown chart kind '{spec['kind']}'")
+
+    cache.put(key, fig.to_json())
+    return key, fig
+
+
+def load_chart(key, spec, cache=FIGURE_CACHE):
+    """
+    Figure of a chat-history entry: straight from the figure cache when
+    still there, rebuilt from its spec otherwise.
+    """
+    payload = cache.get(key) if key else None
+    if payload is not None:
+        return pio.from_json(payload)
+    return render_chart(spec, cache)[1]
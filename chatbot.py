@@ -1,14 +1,203 @@
-import streamlit as st
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from types import SimpleNamespace
+
+import httpx
+import openai
 from openai import AzureOpenAI
 
-AZURE_OPENAI_API_KEY = st.secrets["AZURE_OPENAI_API_KEY"]
-AZURE_OPENAI_API_VERSION = st.secrets["AZURE_OPENAI_API_VERSION"]
-AZURE_OPENAI_ENDPOINT = st.secrets["AZURE_OPENAI_ENDPOINT"]
-AZURE_OPENAI_CHAT_DEPLOYMENT_NAME = st.secrets["AZURE_OPENAI_CHAT_DEPLOYMENT_NAME"]
+# Connection settings of the Azure OpenAI deployment
+LLMConfig = namedtuple("LLMConfig", ["endpoint", "api_key", "api_version", "deployment"])
+
+# Setting names, as in .streamlit/secrets.toml or the environment
+CONFIG_KEYS = {
+    "endpoint": "AZURE_OPENAI_ENDPOINT",
+    "api_key": "AZURE_OPENAI_API_KEY",
+    "api_version": "AZURE_OPENAI_API_VERSION",
+    "deployment": "AZURE_OPENAI_CHAT_DEPLOYMENT_NAME",
+}
+
+
+def llm_config(settings=None):
+    """
+    LLMConfig from a mapping of the AZURE_OPENAI_* settings (st.secrets,
+    a dict); the environment by default. KeyError names any missing one.
+    """
+    settings = os.environ if settings is None else settings
+    missing = [name for name in CONFIG_KEYS.values() if not settings.get(name)]
+    if missing:
+        raise KeyError(f"Missing LLM settings: {', '.join(missing)}")
+    return LLMConfig(**{field: settings[name] for field, name in CONFIG_KEYS.items()})
+
+# Latency budget of one LLM call, retries included (seconds)
+LLM_DEADLINE = 20.0
+LLM_ATTEMPT_TIMEOUT = 10.0
+LLM_CONNECT_TIMEOUT = 3.0
+LLM_MAX_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 4.0
+
+# Shared by every client of the process, so connections are reused
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+_HTTP_CLIENT = None
+_HTTP_CLIENT_LOCK = threading.Lock()
+
+
+def get_http_client():
+    global _HTTP_CLIENT
+    with _HTTP_CLIENT_LOCK:
+        if _HTTP_CLIENT is None:
+            _HTTP_CLIENT = httpx.Client(
+                limits=HTTP_POOL_LIMITS,
+                timeout=httpx.Timeout(LLM_ATTEMPT_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            )
+        return _HTTP_CLIENT
+
+
+class LLMUnavailable(RuntimeError):
+    """
+    The LLM did not answer within its latency budget, or the circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls, then fails
+    fast. After `reset_after` seconds one trial call goes through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=3, reset_after=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if self.clock() - self.opened_at >= self.reset_after:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.clock() - self.opened_at < self.reset_after or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+
+def _retry_after(exc):
+    response = getattr(exc, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc):
+    """
+    429s, 5xx, timeouts and connection errors are worth another attempt.
+    """
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return isinstance(exc, (openai.APIConnectionError, httpx.TransportError))
+
+
+class ResilientChatClient:
+    """
+    Wraps an OpenAI client with a per-call deadline, jittered exponential
+    retries on retryable errors and a circuit breaker.
+    Exposes chat.completions.create like the SDK client, and raises
+    LLMUnavailable when the budget is blown or the circuit is open.
+    `model` is the deployment calls go to unless they name one.
+    """
+
+    def __init__(self, client, model=None, deadline=LLM_DEADLINE, attempt_timeout=LLM_ATTEMPT_TIMEOUT,
+                 max_attempts=LLM_MAX_ATTEMPTS, breaker=None):
+        self.client = client
+        self.model = model
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_attempts = max_attempts
+        self.breaker = breaker or CircuitBreaker()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, deadline=None, **kwargs):
+        if not self.breaker.allow():
+            raise LLMUnavailable("LLM circuit is open")
+
+        if self.model is not None:
+            kwargs.setdefault("model", self.model)
+
+        end = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                self.breaker.record_failure()
+                raise LLMUnavailable("LLM deadline exceeded")
+
+            attempt += 1
+            try:
+                response = self.client.chat.completions.create(
+                    timeout=min(self.attempt_timeout, remaining), **kwargs
+                )
+            except Exception as e:
+                if not is_retryable(e):
+                    # The service answered, so it is up
+                    self.breaker.record_success()
+                    raise
+                remaining = end - time.monotonic()
+                delay = _retry_after(e)
+                if delay is None:
+                    # Full jitter
+                    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+                if attempt >= self.max_attempts or delay >= remaining:
+                    self.breaker.record_failure()
+                    raise LLMUnavailable(f"LLM failed after {attempt} attempt(s): {type(e).__name__}") from e
+                time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            return response
+
 
-def get_chatbot_client():
-    return AzureOpenAI(
-        api_key=AZURE_OPENAI_API_KEY,
-        api_version=AZURE_OPENAI_API_VERSION,
-        azure_endpoint=AZURE_OPENAI_ENDPOINT
+def get_chatbot_client(config, **options):
+    """
+    Pooled, deadline-bounded client for an LLMConfig; `options` go to
+    ResilientChatClient.
+    """
+    client = AzureOpenAI(
+        api_key=config.api_key,
+        api_version=config.api_version,
+        azure_endpoint=config.endpoint,
+        http_client=get_http_client(),
+        # Retries are handled by ResilientChatClient within its deadline
+        max_retries=0,
     )
+    return ResilientChatClient(client, model=config.deployment, **options)
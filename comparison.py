@@ -0,0 +1,250 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from aggregates import get_cube
+from data_loader import get_dataset, mirror_key
+from fuzzy_match import ValueMatcher
+from table_index import get_index
+from utils import resolve_measure_column
+
+# Year used when a comparison question names none
+LATEST_YEAR = "2025"
+
+DIM_COLS_1D = ["Dimension Value"]
+DIM_COLS_2D = ["Dimension1 Value", "Dimension2 Value"]
+
+# values: every value of one column found in either version; base_slots /
+# target_slots: position in values of each version's ValueIndex.values(col)
+Alignment = namedtuple("Alignment", ["values", "base_slots", "target_slots", "matcher"])
+
+_SWAP = {DIM_COLS_2D[0]: DIM_COLS_2D[1], DIM_COLS_2D[1]: DIM_COLS_2D[0]}
+
+
+def target_column(col, swapped):
+    """
+    Column of the target table holding what `col` holds in the base table.
+    """
+    return _SWAP.get(col, col) if swapped else col
+
+
+def target_filters(filters, swapped):
+    """
+    {column: value} filters on the base table, keyed for the target table.
+    """
+    return {target_column(col, swapped): value for col, value in filters.items()}
+
+
+class VersionComparison:
+    """
+    Compares the same table across two data versions.
+
+    The dimension values of both versions are aligned once per column into
+    a shared vocabulary, and the means come from each table's AggregateCube.
+    So a whole column of per-value deltas costs a couple of array
+    scatters, and no table is scanned or joined row by row.
+    """
+
+    def __init__(self, base="Jun", target="Sep"):
+        self.base = base.capitalize()
+        self.target = target.capitalize()
+        # (base signature, target signature, table key, column) -> Alignment
+        self._alignments = {}
+        self._lock = threading.Lock()
+
+    def tables(self, table):
+        """
+        (base df, target df, key, swapped) for a 1D dimension or 2D table
+        found in both versions, in either orientation. key is the base
+        table's; swapped is True when the target only has the mirrored one,
+        so its Dimension1/Dimension2 columns are the other way around
+        (see target_column). None if missing.
+        """
+        base, target = get_dataset(self.base), get_dataset(self.target)
+        if "_x_" not in table:
+            if table in base.tables_1d and table in target.tables_1d:
+                return base.tables_1d[table], target.tables_1d[table], table, False
+            return None
+
+        key = next((k for k in (table, mirror_key(table)) if k in base.tables_2d), None)
+        if key is None:
+            return None
+        if key in target.tables_2d:
+            return base.tables_2d[key], target.tables_2d[key], key, False
+        if mirror_key(key) in target.tables_2d:
+            return base.tables_2d[key], target.tables_2d[mirror_key(key)], key, True
+        return None
+
+    def alignment(self, key, col, df_base, df_target, swapped=False):
+        cache_key = (get_dataset(self.base).signature, get_dataset(self.target).signature, key, col, swapped)
+        with self._lock:
+            found = self._alignments.get(cache_key)
+        if found is not None:
+            return found
+
+        base_values = get_index(df_base).values(col)
+        target_values = get_index(df_target).values(target_column(col, swapped))
+        values = pd.Index(base_values).append(pd.Index(target_values)).unique()
+        found = Alignment(
+            values,
+            values.get_indexer(base_values),
+            values.get_indexer(target_values),
+            ValueMatcher(values),
+        )
+        with self._lock:
+            self._alignments[cache_key] = found
+        return found
+
+    def measures(self, df_base, df_target, year, metric):
+        """
+        The measure column of `year metric` in each version (None if missing).
+        """
+        return (
+            resolve_measure_column(df_base, year, metric, self.base),
+            resolve_measure_column(df_target, year, metric, self.target),
+        )
+
+    def compare(self, table, year, metric, col=None):
+        """
+        One row per value of `col` (default: the first dimension of
+        `table`) present in either version, with both means, the change and
+        the % change. NaN where a version has no data for the value.
+        """
+        found = self.tables(table)
+        if found is None:
+            raise KeyError(f"Table `{table}` is not available in both {self.base} and {self.target}.")
+        df_base, df_target, key, swapped = found
+
+        if col is None:
+            # First dimension of the requested orientation
+            col = DIM_COLS_1D[0] if "_x_" not in key else DIM_COLS_2D[0 if key == table else 1]
+        measure_base, measure_target = self.measures(df_base, df_target, year, metric)
+        if not measure_base or not measure_target:
+            raise KeyError(f"Measure `{year} {metric}` is not available in both versions.")
+
+        aligned = self.alignment(key, col, df_base, df_target, swapped)
+        base = np.full(len(aligned.values), np.nan)
+        target = np.full(len(aligned.values), np.nan)
+        base[aligned.base_slots] = get_cube(df_base).marginal_means(col, measure_base)
+        target[aligned.target_slots] = get_cube(df_target).marginal_means(target_column(col, swapped), measure_target)
+
+        change = target - base
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = np.where(base != 0, change / base * 100, np.nan)
+
+        return pd.DataFrame({
+            col: aligned.values,
+            self.base: base,
+            self.target: target,
+            "Change": change,
+            "% Change": pct,
+        })
+
+    def match_filters(self, key, df_base, df_target, filter_values, swapped=False):
+        """
+        Fuzzy-matches filter values against the shared vocabulary of the
+        table's dimension columns, one value per column.
+        Returns ({base column: value}, unmatched filter values); see
+        target_filters for the target table.
+        """
+        cols = DIM_COLS_2D if "_x_" in key else DIM_COLS_1D
+        matched = {}
+        unmatched = []
+        for val in filter_values.values():
+            if not val:
+                continue
+            for col in cols:
+                if col in matched:
+                    continue
+                value = self.alignment(key, col, df_base, df_target, swapped).matcher.best(val)
+                if value is not None:
+                    matched[col] = value
+                    break
+            else:
+                unmatched.append(val)
+        return matched, unmatched
+
+
+# -------------------------------------------------
+# Shared engines, one per version pair
+# -------------------------------------------------
+_COMPARISONS = {}
+_COMPARISONS_LOCK = threading.Lock()
+
+
+def get_comparison(base="Jun", target="Sep"):
+    key = (base.capitalize(), target.capitalize())
+    with _COMPARISONS_LOCK:
+        if key not in _COMPARISONS:
+            _COMPARISONS[key] = VersionComparison(*key)
+        return _COMPARISONS[key]
+
+
+def _signed(value, suffix=""):
+    return f"{'+' if value >= 0 else ''}{value}{suffix}"
+
+
+def generate_comparison_answer(comparison, intent, top=3):
+    """
+    Text answer for "how did X change between Jun and Sep" questions.
+    Without filters it also lists the values that moved most.
+    """
+    year = intent.get("year") or LATEST_YEAR
+    metric = intent.get("metric")
+    dims = intent.get("dimensions", [])
+    base, target = comparison.base, comparison.target
+
+    if not metric:
+        return "⚠️ Please specify a metric."
+    if len(dims) not in (1, 2):
+        return f"⚠️ Detected {len(dims)} dimensions. Expected 1 or 2."
+
+    table = "_x_".join(dims)
+    found = comparison.tables(table)
+    if found is None:
+        return f"⚠️ `{' × '.join(dims)}` is not available in both {base} and {target}."
+    df_base, df_target, key, swapped = found
+
+    measure_base, measure_target = comparison.measures(df_base, df_target, year, metric)
+    if not measure_base or not measure_target:
+        return f"⚠️ `{year} {metric}` is not available in both {base} and {target}."
+
+    filters, unmatched = comparison.match_filters(key, df_base, df_target, intent.get("filter_values", {}), swapped)
+    if unmatched:
+        return f"⚠️ No data found for `{unmatched[0]}` in {base} or {target}."
+
+    old = get_cube(df_base).mean(measure_base, filters)
+    new = get_cube(df_target).mean(measure_target, target_filters(filters, swapped))
+    label = " × ".join(filters.values()) if filters else "overall average"
+    subject = f"**{year} {metric}** for **{label}**" if filters else f"**{year} {metric}** {label}"
+
+    if np.isnan(old) or np.isnan(new):
+        missing = base if np.isnan(old) else target
+        return f"⚠️ No {missing} data for {subject}."
+
+    change = round(new - old, 2)
+    answer = (
+        f"📊 {subject} went from **{round(old, 2)}** ({base}) "
+        f"to **{round(new, 2)}** ({target}): **{_signed(change)}**"
+    )
+    if old != 0:
+        answer += f" (**{_signed(round((new - old) / old * 100, 2), '%')}**)"
+    answer += "."
+
+    if not filters:
+        moves = comparison.compare(table, year, metric).dropna(subset=["% Change"])
+        col = moves.columns[0]
+        up = moves.nlargest(top, "% Change")
+        down = moves.nsmallest(top, "% Change")
+        if len(up):
+            answer += "\n\nLargest increases: " + ", ".join(
+                f"{r[col]} ({_signed(round(r['% Change'], 2), '%')})" for _, r in up.iterrows()
+            )
+        if len(down):
+            answer += "\n\nLargest decreases: " + ", ".join(
+                f"{r[col]} ({_signed(round(r['% Change'], 2), '%')})" for _, r in down.iterrows()
+            )
+
+    return answer
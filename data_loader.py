@@ -1,8 +1,32 @@
 import os
+import glob
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from collections import OrderedDict, namedtuple
+from collections.abc import Mapping
 import pandas as pd
 
+from aggregates import get_cube, register_cube
+from table_index import get_index, register_index
+from xlsx_reader import read_xlsx
+
 BASE_DIR = "output_versions"
 
+# Parsed workbooks are cached here as Parquet, one file per source xlsx
+CACHE_DIR = os.path.join(BASE_DIR, ".cache")
+
+# How many 2D tables stay parsed in memory per version
+MAX_RESIDENT_2D = 8
+
+# Keep 2D tables in the sparse layout from compact_table
+SPARSE_2D = True
+
+# Processes used to parse uncached workbooks (1 = parse in this process)
+INGEST_WORKERS = os.cpu_count() or 1
+
 TABLE_MAP = {
     "industry": "industry.xlsx",
     "practice_area": "practice_area.xlsx",
@@ -16,28 +40,398 @@ TABLE_MAP = {
     "matter_type": "matter_type.xlsx",
 }
 
-def load_all_tables(version: str):
+# -------------------------------------------------
+# Columnar cache
+# -------------------------------------------------
+def _source_signature(path):
+    """
+    Short hash of the source path, mtime and size.
+    Any edit to the workbook changes it, which makes the old cache entry stale.
+    """
+    st = os.stat(path)
+    raw = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _cache_path(path):
+    version = os.path.basename(os.path.dirname(path))
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, version, f"{stem}.{_source_signature(path)}.parquet")
+
+
+def _write_cache(df, cache_path):
+    folder = os.path.dirname(cache_path)
+    os.makedirs(folder, exist_ok=True)
+
+    # Drop entries written for older revisions of the same workbook
+    stem = os.path.basename(cache_path).split(".")[0]
+    for old in glob.glob(os.path.join(glob.escape(folder), f"{glob.escape(stem)}.*.parquet")):
+        if old != cache_path:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                # Another writer got there first
+                pass
+
+    # Unique per writer: threads of one process may cache the same workbook
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=f"{stem}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, cache_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_table(path, columns=None):
+    """
+    Reads one pivot workbook through the Parquet cache.
+    The xlsx is parsed only when no cache entry matches its current mtime/size.
+
+    `columns` (stripped names) limits what is read. A cold partial read
+    streams just those columns out of the sheet and leaves the cache alone.
+    """
+    cache_path = _cache_path(path)
+    if os.path.exists(cache_path):
+        return pd.read_parquet(cache_path, columns=columns)
+
+    if columns is not None:
+        df = read_xlsx(path, usecols=columns)
+        df.columns = [c.strip() for c in df.columns]
+        return df[[c for c in columns if c in df.columns]]
+
+    df = read_xlsx(path)
+    df.columns = [c.strip() for c in df.columns]
+
+    try:
+        _write_cache(df, cache_path)
+    except OSError:
+        # Read-only deployments still work, just without the cache
+        pass
+
+    return df
+
+
+def is_cached(path):
+    return os.path.exists(_cache_path(path))
+
+
+def parse_to_cache(path):
+    """
+    Process-pool worker: parses one workbook and writes its cache entry.
+    Returns the entry's path, so only a short string crosses back to the
+    parent, which reads the Parquet file directly; the frame itself only
+    when the cache cannot be written.
+    """
+    df = read_xlsx(path)
+    df.columns = [c.strip() for c in df.columns]
+    cache_path = _cache_path(path)
+    try:
+        _write_cache(df, cache_path)
+    except OSError:
+        return df
+    return cache_path
+
+
+def cache_workbook(path):
+    """
+    Warm-up worker: parses one workbook into the cache and returns nothing.
+    """
+    if is_cached(path):
+        return
+    df = read_xlsx(path)
+    df.columns = [c.strip() for c in df.columns]
+    try:
+        _write_cache(df, _cache_path(path))
+    except OSError:
+        pass
+
+
+def _parse_in_pool(paths, workers, worker=parse_to_cache):
+    """
+    Runs `worker` over `paths` in `workers` processes; yields its results in order.
+    """
+    # spawn: forking a threaded Streamlit server is unsafe
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths)), mp_context=ctx) as pool:
+        yield from pool.map(worker, paths)
+
+
+def read_tables(paths, workers=INGEST_WORKERS):
+    """
+    Reads several workbooks: {path: DataFrame}.
+    Cached ones come straight from Parquet. The rest are parsed in a
+    process pool, since xlsx parsing is CPU-bound and threads do not help.
+    """
+    out = {}
+    missing = []
+    for path in paths:
+        cache_path = _cache_path(path)
+        if os.path.exists(cache_path):
+            out[path] = pd.read_parquet(cache_path)
+        else:
+            missing.append(path)
+
+    if workers <= 1 or len(missing) <= 1:
+        for path in missing:
+            out[path] = read_table(path)
+    else:
+        for path, result in zip(missing, _parse_in_pool(missing, workers)):
+            out[path] = pd.read_parquet(result) if isinstance(result, str) else result
+
+    return {path: out[path] for path in paths}
+
+
+def version_workbooks(version: str):
+    """
+    Paths of every workbook in a version folder (Excel lock files skipped).
+    """
+    folder = os.path.join(BASE_DIR, version.capitalize())
+    if not os.path.exists(folder):
+        raise FileNotFoundError(f"Missing folder: {folder}")
+
+    return [
+        os.path.join(folder, file)
+        for file in sorted(os.listdir(folder))
+        if file.endswith(".xlsx") and not file.startswith("~$")
+    ]
+
+
+def warm_cache(version: str, workers=INGEST_WORKERS):
+    """
+    Parses every uncached workbook of a version (1D and 2D) into the cache.
+    Returns how many workbooks had to be parsed.
+    """
+    missing = [p for p in version_workbooks(version) if not is_cached(p)]
+
+    if workers <= 1 or len(missing) <= 1:
+        for path in missing:
+            read_table(path)
+    else:
+        # Results are only needed on disk
+        for _ in _parse_in_pool(missing, workers, cache_workbook):
+            pass
+
+    return len(missing)
+
+
+def clear_cache(version=None):
+    """
+    Removes cached Parquet files for one version, or for all versions.
+    """
+    folder = CACHE_DIR if version is None else os.path.join(CACHE_DIR, version.capitalize())
+    for path in glob.glob(os.path.join(glob.escape(folder), "**", "*.parquet"), recursive=True):
+        os.remove(path)
+
+
+# -------------------------------------------------
+# Loaders
+# -------------------------------------------------
+def load_all_tables(version: str, workers=INGEST_WORKERS):
     version = version.capitalize()
     folder = os.path.join(BASE_DIR, version)
 
     if not os.path.exists(folder):
         raise FileNotFoundError(f"Missing folder: {folder}")
 
-    data = {}
+    paths = {}
     for key, file in TABLE_MAP.items():
         path = os.path.join(folder, file)
         if not os.path.exists(path):
             raise FileNotFoundError(path)
+        paths[key] = path
 
-        df = pd.read_excel(path)
-        df.columns = [c.strip() for c in df.columns]
+    tables = read_tables(list(paths.values()), workers=workers)
+
+    data = {}
+    for key, path in paths.items():
+        df = categorize(tables[path])
+        get_cube(df)
         data[key] = df
 
     return data
 
-def load_all_2d_tables(version: str):
+# -------------------------------------------------
+# Categorical / sparse layout
+# -------------------------------------------------
+def categorize(df):
+    """
+    Stores the dimension (non-numeric) columns as categoricals.
+    """
+    out = df.copy()
+    for c in out.columns:
+        if not pd.api.types.is_numeric_dtype(out[c]):
+            out[c] = out[c].astype("category")
+    return out
+
+
+def compact_table(df):
+    """
+    Sparse in-memory layout for the zero-filled 2D tables.
+    Dimension columns become categoricals. Each measure becomes a SparseArray
+    whose fill value is its most frequent value (0.0 for Avg Rate, NaN for
+    the counts), so filters and means give the same numbers as the dense frame.
+    Measures keep their original dtype: float32 would change rounded answers.
+    """
+    out = {}
+    for c in df.columns:
+        s = df[c]
+        if not pd.api.types.is_numeric_dtype(s):
+            out[c] = s.astype("category")
+            continue
+
+        fill = s.value_counts(dropna=False).index[0] if len(s) else float("nan")
+        out[c] = s.astype(pd.SparseDtype(s.dtype, fill))
+
+    return pd.DataFrame(out, index=df.index)
+
+
+def densify(df):
+    """
+    Inverse of compact_table, for code that needs plain columns (plotting).
+    """
+    out = {}
+    for c in df.columns:
+        s = df[c]
+        if isinstance(s.dtype, pd.SparseDtype):
+            s = s.sparse.to_dense()
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype(s.cat.categories.dtype)
+        out[c] = s
+
+    return pd.DataFrame(out, index=df.index)
+
+
+def mirror_key(key):
+    """
+    industry_x_city -> city_x_industry
+    """
+    dims = key.split("_x_")
+    return "_x_".join(reversed(dims))
+
+
+def mirror_view(df):
+    """
+    Serves a 2D table in the opposite orientation.
+    Only the two dimension columns swap names and positions; the measure
+    data is shared with the source frame, not copied.
+    """
+    d1, d2 = "Dimension1 Value", "Dimension2 Value"
+    if d1 not in df.columns or d2 not in df.columns:
+        raise KeyError(f"Not a 2D table, columns: {list(df.columns)}")
+
+    swapped = df.rename(columns={d1: d2, d2: d1})
+    cols = [d1, d2] + [c for c in swapped.columns if c not in (d1, d2)]
+    return swapped[cols]
+
+
+class LazyTableMap(Mapping):
     """
-    Loads all 2D pivot tables (files containing '_x_')
+    Dict-like view over the 2D tables of one version folder.
+    Keys come from the folder listing; a table is read the first time it
+    is requested and the least recently used ones are evicted beyond max_size.
+
+    Mirrored pairs (a_x_b and b_x_a) are stored once: the lexically smaller
+    key is read and the other orientation is served through mirror_view.
+    Every served table has its ValueIndex and AggregateCube built up front.
+    """
+
+    def __init__(self, folder, max_size=MAX_RESIDENT_2D, sparse=SPARSE_2D):
+        self.folder = folder
+        self.max_size = max_size
+        self.sparse = sparse
+        self._paths = {
+            file[:-len(".xlsx")]: os.path.join(folder, file)
+            for file in sorted(os.listdir(folder))
+            if "_x_" in file and file.endswith(".xlsx")
+        }
+        # key -> key of the file actually read for it
+        self._canonical = {
+            key: min(key, mirror_key(key)) if mirror_key(key) in self._paths else key
+            for key in self._paths
+        }
+        # canonical key -> {key: DataFrame} for the table and its mirror view
+        self._tables = OrderedDict()
+        # canonical key -> Future of a read in progress, so concurrent
+        # requests (e.g. a background warm-up) share it instead of re-reading
+        self._pending = {}
+        # Shared across Streamlit sessions, which run on separate threads
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        canonical = self._canonical[key]
+        entry = self._load(canonical)
+
+        if key not in entry:
+            df = entry[canonical]
+            view = mirror_view(df)
+            # Same rows, so the index and cube only need their column names swapped
+            swap = {
+                "Dimension1 Value": "Dimension2 Value",
+                "Dimension2 Value": "Dimension1 Value",
+            }
+            index = get_index(df).renamed(swap)
+            register_index(view, index)
+            register_cube(view, get_cube(df).renamed(swap, index))
+            with self._lock:
+                entry.setdefault(key, view)
+
+        return entry[key]
+
+    def _load(self, key):
+        with self._lock:
+            if key in self._tables:
+                self._tables.move_to_end(key)
+                return self._tables[key]
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = Future()
+                reader = True
+            else:
+                reader = False
+
+        if not reader:
+            return pending.result()
+
+        try:
+            df = read_table(self._paths[key])
+            df = compact_table(df) if self.sparse else categorize(df)
+            get_cube(df)
+
+            with self._lock:
+                entry = self._tables.setdefault(key, {key: df})
+                while len(self._tables) > self.max_size:
+                    self._tables.popitem(last=False)
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+        pending.set_result(entry)
+        return entry
+
+    def __contains__(self, key):
+        return key in self._paths
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def loaded_keys(self):
+        with self._lock:
+            return list(self._tables)
+
+
+def load_all_2d_tables(version: str, sparse=SPARSE_2D):
+    """
+    Indexes all 2D pivot tables (files containing '_x_').
+    Tables are parsed lazily on first access, see LazyTableMap.
     """
     version = version.capitalize()
     folder = os.path.join(BASE_DIR, version)
@@ -45,17 +439,89 @@ def load_all_2d_tables(version: str):
     if not os.path.exists(folder):
         raise FileNotFoundError(f"Missing folder: {folder}")
 
-    data_2d = {}
+    return LazyTableMap(folder, sparse=sparse)
 
-    for file in os.listdir(folder):
-        if "_x_" in file and file.endswith(".xlsx"):
-            key = file.replace(".xlsx", "")
-            path = os.path.join(folder, file)
 
-            df = pd.read_excel(path)
-            df.columns = [c.strip() for c in df.columns]
+# -------------------------------------------------
+# Process-wide dataset registry
+# -------------------------------------------------
+Dataset = namedtuple("Dataset", ["version", "signature", "tables_1d", "tables_2d"])
 
-            data_2d[key] = df
+_DATASETS = {}
+# (version, signature) -> Future of a load in progress, shared by every caller
+_LOADING = {}
+_DATASETS_LOCK = threading.Lock()
 
-    return data_2d
 
+def dataset_signature(version: str):
+    """
+    Fingerprint of a version folder: file names, mtimes and sizes.
+    """
+    folder = os.path.join(BASE_DIR, version.capitalize())
+    if not os.path.exists(folder):
+        raise FileNotFoundError(f"Missing folder: {folder}")
+
+    h = hashlib.sha1()
+    for file in sorted(os.listdir(folder)):
+        if not file.endswith(".xlsx"):
+            continue
+        st = os.stat(os.path.join(folder, file))
+        h.update(f"{file}|{st.st_mtime_ns}|{st.st_size};".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def get_dataset(version: str):
+    """
+    Returns the shared Dataset for a version, loading it once per process.
+    The entry is rebuilt when any workbook in the folder changes.
+    Tables are shared between sessions and must be treated as read-only.
+    The lock only guards the registry: loading one version does not block
+    callers of another, and concurrent callers of the same one share its load.
+    """
+    version = version.capitalize()
+    signature = dataset_signature(version)
+    key = (version, signature)
+
+    with _DATASETS_LOCK:
+        ds = _DATASETS.get(version)
+        if ds is not None and ds.signature == signature:
+            return ds
+        pending = _LOADING.get(key)
+        if pending is None:
+            pending = _LOADING[key] = Future()
+            loader = True
+        else:
+            loader = False
+
+    if not loader:
+        return pending.result()
+
+    try:
+        ds = Dataset(
+            version=version,
+            signature=signature,
+            tables_1d=load_all_tables(version),
+            tables_2d=load_all_2d_tables(version),
+        )
+    except BaseException as e:
+        with _DATASETS_LOCK:
+            _LOADING.pop(key, None)
+        pending.set_exception(e)
+        raise
+
+    with _DATASETS_LOCK:
+        _DATASETS[version] = ds
+        _LOADING.pop(key, None)
+    pending.set_result(ds)
+    return ds
+
+
+def invalidate_dataset(version=None):
+    """
+    Drops the shared Dataset for one version, or for all versions.
+    """
+    with _DATASETS_LOCK:
+        if version is None:
+            _DATASETS.clear()
+        else:
+            _DATASETS.pop(version.capitalize(), None)
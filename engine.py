@@ -0,0 +1,334 @@
+import threading
+from collections import namedtuple
+
+from chart_specs import chart_spec, load_chart, render_chart
+from chatbot import get_chatbot_client, llm_config
+from comparison import LATEST_YEAR, generate_comparison_answer, get_comparison
+from data_loader import get_dataset
+from figure_cache import FIGURE_CACHE
+from intent_parser import (
+    LOCAL_CONFIDENCE_THRESHOLD, detect_version_comparison, has_negation, parse_intent, resolve_intent_locally,
+    route_unexplained,
+)
+from llm_text_intent import INTENT_CACHE, llm_parse_text_intent
+from prefetch import VersionPrefetcher, discard_warmups, warm_candidates, warm_table
+from ranking import generate_ranking_answer
+from table_catalog import snap_table, table_catalog
+from text_answers import generate_2d_text_answer, generate_text_answer
+from trends import generate_trend_answer
+from utils import resolve_measure_column
+from value_search import get_value_index
+
+VERSIONS = ("Jun", "Sep")
+
+# Without the LLM, rule-based intents below this, or with any word the
+# rules could not explain, are not answered at all: a dropped or wrong
+# filter reads like a right answer
+FALLBACK_MIN_CONFIDENCE = 0.7
+
+FALLBACK_REFUSAL = (
+    "⚠️ The language model is unavailable right now, and the built-in rules could not "
+    "fully understand this question. Please rephrase it with the year, metric and values "
+    "spelled out, e.g. \"2025 avg rate for partners in New York\"."
+)
+FALLBACK_NOTE = "\n\n_ℹ️ Answered by the built-in rules: the language model is unavailable right now._"
+FALLBACK_YEAR_NOTE = "\n\n_ℹ️ No year was given, so this is for {year}._"
+
+# Rankings, trends and charts are answered by the rules alone
+RULES_NEGATION = (
+    "⚠️ Rankings, trends and charts can't exclude values yet (\"not\", \"excluding\", …). "
+    "Please ask for the values to include instead."
+)
+RULES_UNEXPLAINED = (
+    "⚠️ Rankings, trends and charts are answered by the built-in rules, which did not "
+    "understand {words}. Please rephrase without them, e.g. \"top 10 cities by 2025 avg rate\"."
+)
+
+# Everything a question about one data version is answered from
+VersionContext = namedtuple("VersionContext", ["version", "tables_1d", "tables_2d", "value_index", "catalog"])
+
+
+def text_reply(content, level="info", exception=None):
+    """
+    Reply holding markdown; level is "info", "warning" or "error".
+    """
+    return {"type": "text", "content": content, "level": level, "exception": exception}
+
+
+def plot_reply(spec, key, title, figure):
+    """
+    Reply holding a chart: its spec and figure-cache key (enough to
+    rebuild it later, see QueryEngine.figure) and the figure itself.
+    """
+    return {"type": "plot", "spec": spec, "key": key, "title": title, "figure": figure}
+
+
+class QueryEngine:
+    """
+    Answers questions about the pivot tables without any UI: loads the data
+    versions, resolves intents (rules first, the LLM when they are unsure),
+    and builds text answers and charts. Replies are plain dicts
+    (text_reply / plot_reply) for Streamlit, the HTTP API or a batch job.
+
+    config is a chatbot.LLMConfig; without one, the AZURE_OPENAI_*
+    environment variables are read when the LLM is first needed, and when
+    those are missing too, questions are answered by the rules alone.
+    """
+
+    def __init__(self, config=None, client=None, figure_cache=FIGURE_CACHE, intent_cache=INTENT_CACHE):
+        self.config = config
+        self.figure_cache = figure_cache
+        self.intent_cache = intent_cache
+        self.prefetcher = VersionPrefetcher()
+        self._client = client
+        self._client_error = None
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------
+    # Resources
+    # -------------------------------------------------
+    @property
+    def client(self):
+        """
+        The LLM client, built on first use; None when no config is available.
+        """
+        with self._lock:
+            if self._client is None and self._client_error is None:
+                try:
+                    self._client = get_chatbot_client(self.config or llm_config())
+                except KeyError as e:
+                    self._client_error = str(e)
+            return self._client
+
+    def prefetch(self, versions=VERSIONS):
+        """
+        Warms data versions in the background (see VersionPrefetcher).
+        """
+        for version in versions:
+            self.prefetcher.start(version)
+        return self.prefetcher
+
+    def context(self, version):
+        dataset = get_dataset(version)
+        return VersionContext(
+            version=dataset.version,
+            tables_1d=dataset.tables_1d,
+            tables_2d=dataset.tables_2d,
+            value_index=get_value_index(version),
+            catalog=table_catalog(dataset.tables_1d, dataset.tables_2d),
+        )
+
+    def stats(self):
+        client = self._client
+        return {
+            "llm_circuit": client.breaker.state if client is not None else self._client_error or "not started",
+            "intent_cache": self.intent_cache.stats(),
+            "figure_cache": self.figure_cache.stats(),
+            "prefetch": self.prefetcher.progress(),
+        }
+
+    # -------------------------------------------------
+    # Intents
+    # -------------------------------------------------
+    def text_intent(self, query, ctx):
+        """
+        Text intent of a question: from the rules when they are confident,
+        from the LLM otherwise, and from the rules again (source "fallback")
+        when the LLM is slow, down or not configured.
+        """
+        intent = resolve_intent_locally(query, ctx.value_index, ctx.tables_2d)
+        if intent["confidence"] >= LOCAL_CONFIDENCE_THRESHOLD:
+            return intent
+
+        client = self.client
+        if client is None:
+            intent["source"] = "fallback"
+            return intent
+
+        # When the LLM is slow or down, text questions get the rule-based intent
+        def rules_fallback(question):
+            return resolve_intent_locally(question, ctx.value_index, ctx.tables_2d)
+
+        # Streamed intents name their table first; start loading it right away
+        def on_intent_field(key, value):
+            if key == "table" and isinstance(value, str) and value:
+                table = snap_table(value, ctx.catalog)
+                if table:
+                    warm_table(ctx.version, table)
+
+        # Load the tables the rules point at while the LLM is working
+        speculative = warm_candidates(ctx.version, intent)
+        try:
+            return llm_parse_text_intent(
+                client, query, cache=self.intent_cache, fallback=rules_fallback,
+                on_field=on_intent_field, catalog=ctx.catalog,
+            )
+        finally:
+            discard_warmups(speculative)
+
+    # -------------------------------------------------
+    # Answers
+    # -------------------------------------------------
+    def answer(self, query, version):
+        """
+        Reply to one question about `version`.
+        """
+        try:
+            ctx = self.context(version)
+            rule = parse_intent(query, ctx.value_index)
+            compare_versions = detect_version_comparison(query)
+
+            if compare_versions:
+                comparison = get_comparison(*compare_versions)
+                return self._with_intent(query, ctx, lambda intent: text_reply(generate_comparison_answer(comparison, intent)))
+            if rule["ranking"] or rule["trend"] or rule["chart"]:
+                refusal = self._check_rules(query, rule, ctx)
+                if refusal is not None:
+                    return refusal
+            if rule["ranking"]:
+                return self._ranking(rule, ctx)
+            if rule["trend"]:
+                return self._trend(rule, ctx)
+            if rule["chart"]:
+                return self._chart(rule, ctx)
+            return self._with_intent(query, ctx, lambda intent: self._text(intent, ctx))
+        except Exception as e:
+            return text_reply(f"⚠️ Error: {type(e).__name__}: {str(e)}", "error", e)
+
+    def chart(self, spec, title):
+        """
+        Renders a chart spec; a text reply when it cannot be built.
+        """
+        try:
+            key, fig = render_chart(spec, self.figure_cache)
+        except (KeyError, ValueError) as e:
+            return text_reply(f"⚠️ Visualization error: {str(e)}")
+        return plot_reply(spec, key, title, fig)
+
+    def figure(self, key, spec):
+        """
+        Figure of a chart reply given back by reference (key and spec).
+        """
+        return load_chart(key, spec, self.figure_cache)
+
+    def _check_rules(self, query, rule, ctx):
+        """
+        A warning reply when a ranking, trend or chart question says more
+        than its rule-based intent holds (a negation, unknown words), so
+        nothing is silently dropped; None when it can be answered.
+        """
+        if has_negation(query, ctx.value_index):
+            return text_reply(RULES_NEGATION, "warning")
+        unexplained = route_unexplained(query, ctx.value_index, rule)
+        if unexplained:
+            words = ", ".join(f"`{w}`" for w in unexplained)
+            return text_reply(RULES_UNEXPLAINED.format(words=words), "warning")
+        return None
+
+    def _ranking(self, rule, ctx):
+        if rule["chart"] and rule["ranking"]["order"] != "percentile":
+            return self.chart(chart_spec("ranking", ctx.version, intent=rule), f"{rule['metric']} ranking")
+        return text_reply(generate_ranking_answer(ctx.tables_1d, ctx.tables_2d, rule, ctx.version))
+
+    def _trend(self, rule, ctx):
+        dims = rule.get("dimensions", [])
+
+        table = None
+        if len(dims) == 1:
+            table = dims[0] if dims[0] in ctx.tables_1d else None
+        elif len(dims) == 2:
+            for key in ("_x_".join(dims), "_x_".join(reversed(dims))):
+                if key in ctx.tables_2d:
+                    table = key
+                    break
+        else:
+            return text_reply(f"⚠️ Detected {len(dims)} dimensions. Expected 1 or 2.")
+
+        if table is None:
+            return text_reply(f"⚠️ Table for `{' × '.join(dims)}` is not available.")
+        if rule["chart"]:
+            return self.chart(chart_spec("trend", ctx.version, table=table, intent=rule), f"{rule['metric']} trend")
+
+        df = ctx.tables_2d[table] if "_x_" in table else ctx.tables_1d[table]
+        try:
+            return text_reply(generate_trend_answer(df, rule, ctx.version))
+        except ValueError as e:
+            return text_reply(f"⚠️ {str(e)}")
+
+    def _chart(self, rule, ctx):
+        dims = rule.get("dimensions", [])
+
+        if len(dims) == 1:
+            table = dims[0]
+            df = ctx.tables_1d.get(table)
+            if df is None:
+                return text_reply(f"⚠️ 1D table `{dims[0]}` not available.", "warning")
+        elif len(dims) == 2:
+            # Try both possible 2D table key formats
+            table = "_x_".join(dims)
+            df = ctx.tables_2d.get(table)
+            if df is None:
+                table = "_x_".join(reversed(dims))
+                df = ctx.tables_2d.get(table)
+            if df is None:
+                return text_reply(f"⚠️ 2D table `{'_x_'.join(dims)}` not available.", "warning")
+        else:
+            return text_reply(f"⚠️ Detected {len(dims)} dimensions. Expected 1 or 2.", "warning")
+
+        measure_col = resolve_measure_column(df, rule["year"], rule["metric"], ctx.version)
+        if not measure_col:
+            return text_reply(f"⚠️ Measure column not found for {rule['year']} {rule['metric']}.", "warning")
+
+        reply = self.chart(
+            chart_spec("generic", ctx.version, table=table, measure=measure_col, chart=rule["chart"]),
+            f"{measure_col} {rule['chart']}",
+        )
+        if reply["type"] == "text":
+            reply["level"] = "warning"
+        return reply
+
+    def _with_intent(self, query, ctx, build):
+        """
+        Resolves the text intent and builds the reply from it. A rule-based
+        fallback (LLM down or not configured) is only answered from
+        FALLBACK_MIN_CONFIDENCE up and when every word was understood.
+        Like version comparisons, it defaults to the latest year, and its
+        answer says so and that it is rule-based.
+        """
+        intent = self.text_intent(query, ctx)
+        if intent.get("source") != "fallback":
+            return build(intent)
+        if intent["confidence"] < FALLBACK_MIN_CONFIDENCE or intent.get("unexplained"):
+            return text_reply(FALLBACK_REFUSAL, "warning")
+
+        note = FALLBACK_NOTE
+        if not intent.get("year"):
+            intent["year"] = LATEST_YEAR
+            note = FALLBACK_YEAR_NOTE.format(year=LATEST_YEAR) + note
+        reply = build(intent)
+        # Warnings ("⚠️ ...") are not answers
+        if reply["type"] == "text" and reply["level"] == "info" and not reply["content"].startswith("⚠️"):
+            reply["content"] += note
+        return reply
+
+    def _text(self, intent, ctx):
+        dims = intent.get("dimensions", [])
+
+        # -------- 1D TEXT --------
+        if len(dims) == 1:
+            df = ctx.tables_1d.get(dims[0])
+            if df is None:
+                return text_reply(f"⚠️ 1D table `{dims[0]}` not available.")
+            return text_reply(generate_text_answer(df, intent, ctx.version, ctx.value_index))
+
+        # -------- 2D TEXT --------
+        if len(dims) == 2:
+            # Try both possible key orders
+            df = ctx.tables_2d.get("_x_".join(dims))
+            if df is None:
+                df = ctx.tables_2d.get("_x_".join(reversed(dims)))
+            if df is None:
+                return text_reply(f"⚠️ 2D table for `{' × '.join(dims)}` is not available.")
+            return text_reply(generate_2d_text_answer(df, intent, ctx.version))
+
+        return text_reply(f"⚠️ Detected {len(dims)} dimensions. Expected 1 or 2.")
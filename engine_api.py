@@ -0,0 +1,127 @@
+"""
+Local HTTP API over the QueryEngine, without Streamlit:
+
+    python engine_api.py --port 8765
+
+    POST /ask     {"question": "...", "version": "Sep"}  -> reply
+    POST /chart   {"key": "...", "spec": {...}}          -> Plotly figure JSON
+    GET  /health                                         -> engine stats
+
+LLM settings come from the AZURE_OPENAI_* environment variables; without
+them questions are answered by the rules alone.
+"""
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from engine import QueryEngine, VERSIONS
+
+DEFAULT_PORT = 8765
+
+
+def reply_json(reply):
+    """
+    JSON-safe copy of an engine reply: the figure as Plotly JSON, no exception.
+    """
+    out = {k: v for k, v in reply.items() if k not in ("figure", "exception")}
+    if reply["type"] == "plot":
+        out["figure"] = json.loads(reply["figure"].to_json())
+    return out
+
+
+def make_handler(engine):
+    class EngineHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, code, payload):
+            body = json.dumps(payload, default=str).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", **engine.stats()})
+            else:
+                self._send(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            try:
+                body = self._body()
+            except json.JSONDecodeError as e:
+                self._send(400, {"error": f"Invalid JSON: {e}"})
+                return
+            if not isinstance(body, dict):
+                self._send(400, {"error": "Expected a JSON object"})
+                return
+
+            if self.path == "/ask":
+                question = body.get("question")
+                version = str(body.get("version") or VERSIONS[-1]).capitalize()
+                if not question:
+                    self._send(400, {"error": "Missing 'question'"})
+                elif version not in VERSIONS:
+                    self._send(400, {"error": f"Unknown version '{version}'"})
+                else:
+                    self._send(200, reply_json(engine.answer(question, version)))
+
+            elif self.path == "/chart":
+                spec = body.get("spec")
+                if not isinstance(spec, dict):
+                    self._send(400, {"error": "Missing 'spec'"})
+                    return
+                # The version names a data folder: only known ones are opened
+                if str(spec.get("version")).capitalize() not in VERSIONS:
+                    self._send(400, {"error": f"Unknown version '{spec.get('version')}'"})
+                    return
+                try:
+                    fig = engine.figure(body.get("key"), spec)
+                except (KeyError, ValueError) as e:
+                    self._send(404, {"error": f"Chart not available: {e}"})
+                    return
+                except Exception as e:
+                    self._send(400, {"error": f"Invalid chart spec: {type(e).__name__}: {e}"})
+                    return
+                self._send(200, json.loads(fig.to_json()))
+
+            else:
+                self._send(404, {"error": f"Unknown path {self.path}"})
+
+    return EngineHandler
+
+
+def serve(engine, host="127.0.0.1", port=DEFAULT_PORT):
+    """
+    Serves the engine until interrupted.
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(engine))
+    print(f"Serving on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LegalVIEW query engine over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--no-prefetch", action="store_true", help="load data versions on first use")
+    args = parser.parse_args()
+
+    engine = QueryEngine()
+    if not args.no_prefetch:
+        engine.prefetch(VERSIONS)
+    serve(engine, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
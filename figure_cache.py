@@ -0,0 +1,94 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from table_index import FrameRegistry
+
+
+def _fingerprint(df):
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    digest = hashlib.sha1(hashes.tobytes())
+    digest.update(repr(list(df.columns)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+_FINGERPRINTS = FrameRegistry(_fingerprint)
+
+
+def data_fingerprint(df):
+    """
+    Content hash of a table, computed once per DataFrame.
+    """
+    return _FINGERPRINTS.get(df)
+
+
+def figure_key(df, version, table, measure_col, chart_type):
+    """
+    Cache key of one chart: its inputs plus the fingerprint of the data.
+    """
+    raw = f"{version}|{table}|{measure_col}|{chart_type}|{data_fingerprint(df)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class FigureCache:
+    """
+    Process-wide LRU of serialized Plotly figures (fig.to_json()), bounded
+    by entry count and total JSON size, so every session reuses a chart
+    once it has been built.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            if len(payload) > self.max_bytes:
+                return
+            self._entries[key] = payload
+            self._bytes += len(payload)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= len(old)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+FIGURE_CACHE = FigureCache()
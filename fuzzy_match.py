@@ -0,0 +1,95 @@
+import re
+from difflib import SequenceMatcher
+
+import numpy as np
+
+
+# Thresholds shared with text_answers.best_match
+MIN_SCORE = 0.6
+CONTAINMENT_SCORE = 0.85
+
+_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"
+_CHAR_POS = {ch: i for i, ch in enumerate(_ALPHABET)}
+
+
+def normalize(s: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", s.lower())
+
+
+def _char_counts(s):
+    counts = np.zeros(len(_ALPHABET), dtype=np.int32)
+    for ch in s:
+        counts[_CHAR_POS[ch]] += 1
+    return counts
+
+
+class ValueMatcher:
+    """
+    Fuzzy matcher over the distinct values of one dimension column.
+
+    Values are normalized once. Each lookup scores all of them with a
+    character-count upper bound in NumPy. Only candidates whose bound can
+    still beat the current best get an exact SequenceMatcher ratio.
+    The bound is never below the real ratio, so results are identical to
+    scanning every value (same 0.6 threshold, same containment bonus, same
+    first-wins tie breaking).
+    """
+
+    def __init__(self, values):
+        self.values = [str(v) for v in values]
+        self.normalized = [normalize(v) for v in self.values]
+        self.lengths = np.array([len(n) for n in self.normalized], dtype=np.int64)
+        self.counts = (
+            np.vstack([_char_counts(n) for n in self.normalized])
+            if self.values else np.zeros((0, len(_ALPHABET)), dtype=np.int32)
+        )
+
+    def best(self, target_value, ids=None):
+        """
+        Best matching value for `target_value`, or None below the threshold.
+        `ids` restricts and orders the candidates (positions in self.values);
+        by default every value is considered in its original order.
+        """
+        target = normalize(target_value)
+        if ids is None:
+            ids = np.arange(len(self.values))
+        else:
+            ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) == 0:
+            return None
+
+        # Upper bound of SequenceMatcher.ratio(): matched chars <= shared chars
+        common = np.minimum(self.counts[ids], _char_counts(target)).sum(axis=1)
+        total = self.lengths[ids] + len(target)
+        bound = np.where(total > 0, 2.0 * common / np.maximum(total, 1), 1.0)
+
+        contained = np.fromiter(
+            (target in self.normalized[i] or self.normalized[i] in target for i in ids),
+            dtype=bool,
+            count=len(ids),
+        )
+        bound = np.where(contained, np.maximum(bound, CONTAINMENT_SCORE), bound)
+
+        sm = SequenceMatcher(None, "", target)
+        best_pos = None
+        best_score = 0
+
+        # Highest bounds first; stop once no remaining candidate can win
+        for pos in np.argsort(-bound, kind="stable"):
+            if bound[pos] < MIN_SCORE or bound[pos] < best_score:
+                break
+
+            i = ids[pos]
+            sm.set_seq1(self.normalized[i])
+            score = sm.ratio()
+            if contained[pos]:
+                score = max(score, CONTAINMENT_SCORE)
+
+            if score > best_score or (score == best_score and best_pos is not None and pos < best_pos):
+                best_score = score
+                best_pos = pos
+
+        if best_pos is not None and best_score >= MIN_SCORE:
+            return self.values[ids[best_pos]]
+
+        return None
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from data_loader import CACHE_DIR
+
+INTENT_CACHE_PATH = os.path.join(CACHE_DIR, "intent_cache.sqlite")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Lowercase, collapse whitespace, drop trailing punctuation.
+    """
+    q = re.sub(r"\s+", " ", str(question).strip().lower())
+    return q.rstrip(" ?!.")
+
+
+def cache_key(question, deployment, prompt):
+    """
+    Key for one LLM intent: normalized question + deployment + prompt hash.
+    """
+    prompt_hash = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+    raw = f"{deployment}|{prompt_hash}|{normalize_question(question)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class IntentCache:
+    """
+    Two-level cache of parsed LLM intents: an in-memory LRU in front of a
+    SQLite table, so repeated questions survive restarts.
+    Pass path=None for a memory-only cache.
+    """
+
+    def __init__(self, path=INTENT_CACHE_PATH, max_size=512):
+        self.path = path
+        self.max_size = max_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _db(self):
+        if self._conn is None and self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS intents (key TEXT PRIMARY KEY, intent TEXT NOT NULL)"
+                )
+                self._conn.commit()
+            except (OSError, sqlite3.Error):
+                # Fall back to memory only
+                self.path = None
+                self._conn = None
+        return self._conn
+
+    def _remember(self, key, payload):
+        self._memory[key] = payload
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return json.loads(payload)
+
+            db = self._db()
+            row = None
+            if db is not None:
+                try:
+                    row = db.execute("SELECT intent FROM intents WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error:
+                    row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._remember(key, row[0])
+            self.hits += 1
+            self.disk_hits += 1
+            return json.loads(row[0])
+
+    def put(self, key, intent):
+        payload = json.dumps(intent)
+        with self._lock:
+            self._remember(key, payload)
+            db = self._db()
+            if db is not None:
+                try:
+                    db.execute("INSERT OR REPLACE INTO intents (key, intent) VALUES (?, ?)", (key, payload))
+                    db.commit()
+                except sqlite3.Error:
+                    pass
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            db = self._db()
+            if db is not None:
+                db.execute("DELETE FROM intents")
+                db.commit()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "memory_entries": len(self._memory),
+            }
@@ -1,4 +1,155 @@
-def parse_intent(query: str):
+import re
+
+from value_search import join_initials
+
+# Use more specific matching to avoid false positives
+DIMENSION_MAP = {
+    "detailed practice area": "detailed_practice_area",  # Check this first (more specific)
+    "practice area": "practice_area",
+    "practice": "practice_area",
+    "years of experience": "years_of_experience",
+    "experience": "years_of_experience",
+    "amlaw bucket": "amlaw_bucket",
+    "amlaw": "amlaw_bucket",
+    "firm size": "firm_size",
+    "matter type": "matter_type",
+    "industry": "industry",
+    "industries": "industry",
+    "role": "role",
+    "city": "city",
+    "cities": "city",
+    "country": "country",
+    "countries": "country",
+}
+
+# Words the local resolver can ignore when judging how much of a question it understood
+FILLER_WORDS = {
+    "a", "an", "and", "the", "of", "for", "in", "on", "at", "by", "to", "s",
+    "what", "whats", "is", "are", "was", "were", "me", "give", "tell", "show",
+    "please", "with", "across", "per", "within", "from", "data",
+    "rate", "rates", "avg", "average", "mean", "hourly", "billing",
+    "count", "counts", "matter", "matters", "timekeeper", "timekeepers", "number",
+    "how", "much", "do", "does", "charge", "charges", "charged", "current", "typical",
+}
+
+# Below this, questions go to the LLM
+LOCAL_CONFIDENCE_THRESHOLD = 0.8
+
+# Exclusions the rules cannot express: "partners not in NYC" would become
+# a New York filter, so such questions always go to the LLM (see has_negation)
+NEGATION_PATTERN = re.compile(
+    r"\b(not|no|non|never|none|except|excluding|exclude|excludes|excluded|"
+    r"without|other than|besides|outside|\w+n't)\b"
+)
+
+# Data versions as they can appear in a question
+VERSION_WORDS = {
+    "jun": "Jun", "june": "Jun",
+    "sep": "Sep", "sept": "Sep", "september": "Sep",
+}
+
+# Extra words a version comparison question is made of
+COMPARISON_WORDS = {
+    "how", "did", "does", "do", "change", "changed", "changes", "compare",
+    "compared", "comparison", "between", "vs", "versus", "difference",
+    "move", "moved", "go", "went", "than", "versions",
+}
+
+
+# Extra words ranking, trend and chart questions are made of
+ROUTE_WORDS = {
+    "which", "who", "has", "have", "had", "among", "rank", "ranked", "ranking",
+    "rankings", "most", "least", "expensive", "percentile", "over", "time",
+    "years", "year", "each", "plot", "chart", "graph", "pie", "donut", "line",
+    "heat", "heatmap", "map", "stack", "stacked", "bar", "bars", "visualize",
+    "did", "change", "changed", "changes", "move", "moved", "evolve", "evolved",
+}
+
+
+# Questions about how a metric moves across 2023-2025
+TREND_PATTERN = re.compile(
+    r"\b(trends?|trending|over time|over the years|across years|growth|grow|grew|"
+    r"growing|yoy|year over year|year-over-year|cagr|by year|each year)\b"
+)
+
+
+# Top-N / bottom-N / percentile questions
+TOP_WORDS = r"top|highest|largest|biggest|most expensive|best"
+BOTTOM_WORDS = r"bottom|lowest|smallest|cheapest|least expensive|worst"
+# Up to 3 digits, so "highest 2025 rate" is not a top-2025
+RANK_PATTERN = re.compile(
+    rf"\b(?:(\d{{1,3}})\s+)?({TOP_WORDS}|{BOTTOM_WORDS})\b(?:\s+(\d{{1,3}})\b)?"
+)
+
+
+def detect_ranking(query: str):
+    """
+    {"order": "top" | "bottom" | "percentile", "n": int or None,
+    "dimension": str or None} for ranking questions, None otherwise.
+    A superlative without a number ("the highest rate") asks for one value;
+    dimension is the one named right after it ("top 10 cities").
+    """
+    q = query.lower()
+    if "percentile" in q:
+        return {"order": "percentile", "n": None, "dimension": None}
+
+    m = RANK_PATTERN.search(q)
+    if not m:
+        return None
+    order = "bottom" if re.fullmatch(BOTTOM_WORDS, m.group(2)) else "top"
+    n = m.group(1) or m.group(3)
+
+    keys = "|".join(re.escape(k) for k in sorted(DIMENSION_MAP, key=len, reverse=True))
+    named = re.match(rf"({keys})s?\b", q[m.end():].lstrip())
+    if not named:
+        # "which 3 industries have the highest rate"
+        named = re.search(rf"\b(\d{{1,3}})\s+({keys})s?\b", q)
+        if named:
+            n = n or named.group(1)
+    dimension = DIMENSION_MAP[named.groups()[-1]] if named else None
+
+    if not n and m.group(2) not in ("top", "bottom"):
+        n = 1
+    return {"order": order, "n": int(n) if n else None, "dimension": dimension}
+
+
+def has_negation(query: str, value_index=None):
+    """
+    Whether the question negates or excludes something. With a
+    value_search.DimensionValueIndex, mentions of values that are
+    themselves worded as negations are skipped: "Non-Litigation" is a
+    matter type, not a negation.
+    """
+    if value_index is None:
+        return bool(NEGATION_PATTERN.search(query.lower()))
+
+    text = list(join_initials(query).lower())
+    for _, value, begin, end in value_index.mention_spans(query):
+        if NEGATION_PATTERN.search(value.lower()):
+            text[begin:end] = " " * (end - begin)
+    return bool(NEGATION_PATTERN.search("".join(text)))
+
+
+def detect_version_comparison(query: str):
+    """
+    (base, target) versions when the question names two different data
+    versions ("between Jun and Sep"), in the order they are mentioned.
+    None otherwise.
+    """
+    found = []
+    for w in re.findall(r"[a-z]+", query.lower()):
+        version = VERSION_WORDS.get(w)
+        if version and version not in found:
+            found.append(version)
+    return tuple(found[:2]) if len(found) >= 2 else None
+
+
+def parse_intent(query: str, value_index=None):
+    """
+    Rule-based intent. With a value_search.DimensionValueIndex, values
+    named in the question ("health care", "partners") are returned as
+    filter_values, and imply the dimensions when no keyword names one.
+    """
     q = query.lower()
 
     # -------- Chart detection --------
@@ -14,6 +165,9 @@ def parse_intent(query: str):
     if "stack" in q:
         chart = "stacked_bar"
 
+    trend = bool(TREND_PATTERN.search(q))
+    ranking = detect_ranking(query)
+
     # -------- Year detection --------
     year = None
     for y in ["2023", "2024", "2025"]:
@@ -22,22 +176,7 @@ def parse_intent(query: str):
             break
 
     # -------- Dimension detection (FIXED) --------
-    # Use more specific matching to avoid false positives
-    dimension_map = {
-        "detailed practice area": "detailed_practice_area",  # Check this first (more specific)
-        "practice area": "practice_area",
-        "practice": "practice_area",
-        "years of experience": "years_of_experience",
-        "experience": "years_of_experience",
-        "amlaw bucket": "amlaw_bucket",
-        "amlaw": "amlaw_bucket",
-        "firm size": "firm_size",
-        "matter type": "matter_type",
-        "industry": "industry",
-        "role": "role",
-        "city": "city",
-        "country": "country",
-    }
+    dimension_map = DIMENSION_MAP
 
     detected_dims = []
     matched_phrases = []  # Track what we've matched to avoid duplicates
@@ -56,6 +195,13 @@ def parse_intent(query: str):
             if len(detected_dims) >= 2:
                 break
 
+    # -------- Filter value detection --------
+    filter_values = {}
+    if value_index is not None:
+        filter_values = value_index.find_values(query)
+        if not detected_dims:
+            detected_dims = list(filter_values)[:2]
+
     # -------- Metric detection --------
     if "matter count" in q or ("matter" in q and "count" in q):
         metric = "Matter Count"
@@ -68,5 +214,102 @@ def parse_intent(query: str):
         "chart": chart,
         "dimensions": detected_dims[:2],  # max 2
         "year": year,
-        "metric": metric
-    }
\ No newline at end of file
+        "metric": metric,
+        "filter_values": filter_values,
+        "trend": trend,
+        "ranking": ranking
+    }
+
+
+def _explained(query, words, rule, value_index, comparison=False):
+    """
+    Positions in `words` explained by filler, the year, version names,
+    dimension keywords and value mentions.
+    """
+    explained = set()
+    for i, w in enumerate(words):
+        if w in FILLER_WORDS or w == rule["year"] or w in VERSION_WORDS:
+            explained.add(i)
+        elif comparison and w in COMPARISON_WORDS:
+            explained.add(i)
+    for phrase in DIMENSION_MAP:
+        size = len(phrase.split())
+        for i in range(len(words) - size + 1):
+            if " ".join(words[i:i + size]) == phrase:
+                explained.update(range(i, i + size))
+    for _, _, _, start, size in value_index.find_mentions(query):
+        explained.update(range(start, start + size))
+    return explained
+
+
+def route_unexplained(query: str, value_index, rule=None):
+    """
+    Words of a ranking, trend or chart question the rules could not
+    explain. Those questions are answered from parse_intent alone, so any
+    such word may be a filter or condition the answer would silently drop.
+    """
+    rule = rule or parse_intent(query, value_index)
+    q = query.lower()
+    words = re.findall(r"[a-z0-9]+", q)
+    explained = _explained(query, words, rule, value_index)
+
+    # Words matched by the ranking and trend patterns, and the ranking count
+    covered = " ".join(m.group() for p in (RANK_PATTERN, TREND_PATTERN) for m in p.finditer(q))
+    route = ROUTE_WORDS | set(re.findall(r"[a-z0-9]+", covered))
+    for i, w in enumerate(words):
+        if w in route or (rule["ranking"] and re.fullmatch(r"\d{1,3}", w)):
+            explained.add(i)
+    return [w for i, w in enumerate(words) if i not in explained]
+
+
+def resolve_intent_locally(query: str, value_index, tables_2d=None):
+    """
+    Builds a text intent (same shape as llm_parse_text_intent) from the
+    rules and the dimension-value index, with a confidence in [0, 1]:
+    the share of meaningful words explained by dimension keywords, values,
+    the year, the metric and version names, reduced when the year is missing
+    (outside version comparisons), a value belongs to another dimension,
+    or the 2D table does not exist.
+    Any word left unexplained scales it below LOCAL_CONFIDENCE_THRESHOLD,
+    and negations ("not in NYC", "excluding") make it 0: one such word can
+    change the meaning of the whole question.
+    Callers should fall back to the LLM below LOCAL_CONFIDENCE_THRESHOLD.
+    The words it could not explain are listed under "unexplained".
+    """
+    rule = parse_intent(query, value_index)
+    dims = rule["dimensions"]
+    words = re.findall(r"[a-z0-9]+", query.lower())
+    comparison = detect_version_comparison(query) is not None
+    explained = _explained(query, words, rule, value_index, comparison)
+
+    confidence = len(explained) / len(words) if words else 0.0
+    if len(explained) < len(words):
+        confidence *= LOCAL_CONFIDENCE_THRESHOLD
+
+    if not dims or has_negation(query, value_index):
+        confidence = 0.0
+    # Version comparisons default to the latest year
+    if not rule["year"] and not comparison:
+        confidence -= 0.3
+    if any(dim not in dims for dim in rule["filter_values"]):
+        confidence -= 0.5
+
+    table = "_x_".join(dims)
+    if len(dims) == 2 and tables_2d is not None:
+        reverse = "_x_".join(reversed(dims))
+        if table not in tables_2d and reverse in tables_2d:
+            table = reverse
+            dims = list(reversed(dims))
+        elif table not in tables_2d:
+            confidence = 0.0
+
+    return {
+        "table": table,
+        "dimensions": dims,
+        "year": rule["year"],
+        "metric": rule["metric"],
+        "filter_values": rule["filter_values"],
+        "source": "local",
+        "confidence": round(max(confidence, 0.0), 3),
+        "unexplained": [w for i, w in enumerate(words) if i not in explained],
+    }
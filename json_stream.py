@@ -0,0 +1,107 @@
+import json
+
+
+class IncrementalJSONParser:
+    """
+    Finds the first top-level JSON object in text that arrives in pieces.
+
+    feed() returns True as soon as the object closes, so a streamed
+    response can be cancelled there. Text before the opening brace
+    (markdown fences, chatter) is skipped. on_field(key, value) fires
+    as soon as a top-level field with a scalar value is complete.
+    """
+
+    def __init__(self, on_field=None):
+        self.on_field = on_field
+        self.text = ""
+        self.result = None
+        self.done = False
+        self._start = None
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._token_start = None    # start of the current top-level string / scalar
+        self._key = None            # top-level key whose value is being read
+        self._expect_key = False
+
+    def feed(self, chunk):
+        if self.done:
+            return True
+        self.text += chunk
+
+        while self._pos < len(self.text):
+            i = self._pos
+            ch = self.text[i]
+            self._pos += 1
+
+            if self._start is None:
+                if ch == "{":
+                    self._start = i
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._string_closed(i)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._token_start = i
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 1:
+                    self._scalar_closed(i)
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish(i)
+                    return True
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect_key = False
+                elif ch == ",":
+                    self._scalar_closed(i)
+                    self._expect_key = True
+                    self._key = None
+                elif not ch.isspace() and self._token_start is None and self._key is not None:
+                    # Start of a number / true / false / null value
+                    self._token_start = i
+
+        return False
+
+    def _string_closed(self, end):
+        literal = self.text[self._token_start:end + 1]
+        self._token_start = None
+        if self._expect_key:
+            self._key = json.loads(literal)
+        elif self._key is not None:
+            self._emit(json.loads(literal))
+
+    def _scalar_closed(self, end):
+        if self._token_start is None or self._key is None:
+            return
+        literal = self.text[self._token_start:end].strip()
+        self._token_start = None
+        try:
+            self._emit(json.loads(literal))
+        except json.JSONDecodeError:
+            pass
+
+    def _emit(self, value):
+        key, self._key = self._key, None
+        if self.on_field is not None:
+            self.on_field(key, value)
+
+    def _finish(self, end):
+        self.done = True
+        self.result = json.loads(self.text[self._start:end + 1])
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 '''TEXT_INTENT_PROMPT = """
 You are an analytics assistant for a Power BI semantic model.
 
@@ -163,4 +165,45 @@ Q: "What's the rate for New York city?"
     "city": "New York"
   }}
 }}
-"""
\ No newline at end of file
+"""
+
+
+# Built per version from the loaded tables (see build_intent_prompt):
+# only tables that exist are offered, in a few short lines
+COMPACT_INTENT_PROMPT = """Legal analytics data. Reply with ONLY one JSON object, no markdown.
+Dimensions (1D tables): {dims}
+2D tables "dimA_x_dimB" (either order) exist for {pairs}
+Pick the 1D table for one dimension, the 2D table for two.
+Metrics: Avg Rate | Timekeeper Count | Matter Count. Years: 2023 | 2024 | 2025, null if not given.
+Filters: the values the user names, keyed by dimension.
+Q: "timekeeper count for corporate practice area and partners in 2023"
+{{"table": "practice_area_x_role", "year": "2023", "metric": "Timekeeper Count", "filters": {{"practice_area": "corporate", "role": "partner"}}}}
+Q: {question}"""
+
+
+def _pairs_text(catalog):
+    # Whichever is shorter: the pairs that exist or the ones that don't
+    listed = ", ".join(f"{a}+{b}" for a, b in catalog.pairs)
+    present = set(catalog.pairs)
+    missing = [
+        f"{a}+{b}"
+        for i, a in enumerate(catalog.dims)
+        for b in catalog.dims[i + 1:]
+        if (a, b) not in present
+    ]
+    if not missing:
+        return "every pair"
+    excluded = "every pair except " + ", ".join(missing)
+    return listed if len(listed) <= len(excluded) else excluded
+
+
+@lru_cache(maxsize=8)
+def build_intent_prompt(catalog):
+    """
+    Intent prompt for one table_catalog(); format it with question=.
+    """
+    return (
+        COMPACT_INTENT_PROMPT
+        .replace("{dims}", ", ".join(catalog.dims))
+        .replace("{pairs}", _pairs_text(catalog))
+    )
@@ -1,9 +1,17 @@
 import json
 import re
-from llm_prompt import TEXT_INTENT_PROMPT
-import streamlit as st
-from chatbot import AZURE_OPENAI_CHAT_DEPLOYMENT_NAME
+import time
+from llm_prompt import TEXT_INTENT_PROMPT, build_intent_prompt
+from chatbot import LLMUnavailable, is_retryable
+from intent_cache import IntentCache, cache_key
+from json_stream import IncrementalJSONParser
+from table_catalog import snap_dimension, snap_table
 
+# Intents are deterministic (temperature=0), so identical questions are cached
+INTENT_CACHE = IntentCache()
+
+# Stream completions and stop reading once the JSON object closes
+STREAM_INTENTS = True
 
 
 def extract_json(text: str) -> dict:
@@ -29,15 +37,61 @@ def extract_json(text: str) -> dict:
         raise ValueError(f"Invalid JSON returned:\n{match.group()}") from e
 
 
-def llm_parse_text_intent(client, question):
+def _messages(prompt, question):
+    return [
+        {
+            "role": "user",
+            "content": prompt.format(question=question)
+        }
+    ]
+
+
+def _stream_intent(client, prompt, question, on_field=None):
+    """
+    Reads a streamed completion through IncrementalJSONParser and closes
+    the stream (cancelling the request) as soon as the JSON object is
+    complete. on_field(key, value) sees top-level fields as they arrive.
+    The client's deadline covers the whole read, not only opening the
+    stream; a stream that fails or runs late counts against the breaker.
+    """
+    end = time.monotonic() + client.deadline
+    stream = client.chat.completions.create(
+        model=client.model,
+        messages=_messages(prompt, question),
+        temperature=0,
+        stream=True
+    )
+
+    parser = IncrementalJSONParser(on_field)
+    try:
+        for chunk in stream:
+            if time.monotonic() > end:
+                client.breaker.record_failure()
+                raise LLMUnavailable("LLM deadline exceeded while streaming")
+            # Azure sends a first chunk without choices (content filter results)
+            if chunk.choices and chunk.choices[0].delta.content:
+                if parser.feed(chunk.choices[0].delta.content):
+                    break
+    except LLMUnavailable:
+        raise
+    except Exception as e:
+        if is_retryable(e):
+            client.breaker.record_failure()
+            raise LLMUnavailable(f"LLM stream failed: {type(e).__name__}") from e
+        raise
+    finally:
+        stream.close()
+
+    if not parser.done:
+        raise ValueError("❌ No JSON object found")
+
+    return parser.result
+
+
+def _complete_intent(client, prompt, question):
     response = client.chat.completions.create(
-        model=AZURE_OPENAI_CHAT_DEPLOYMENT_NAME,
-        messages=[
-            {
-                "role": "user",
-                "content": TEXT_INTENT_PROMPT.format(question=question)
-            }
-        ],
+        model=client.model,
+        messages=_messages(prompt, question),
         temperature=0
     )
 
@@ -54,7 +108,55 @@ def llm_parse_text_intent(client, question):
     json_text = match.group()
 
     # DEBUG 2 — extracted JSON text
-    raw_intent = json.loads(json_text)
+    return json.loads(json_text)
+
+
+def _snap_intent(intent, catalog):
+    """
+    Maps the filter keys and the table of an LLM intent onto the catalog,
+    keeping the original table under "snapped_from" when it changes.
+    """
+    filters = intent.get("filters")
+    if isinstance(filters, dict):
+        intent["filters"] = {snap_dimension(k, catalog) or k: v for k, v in filters.items()}
+
+    table = intent.get("table") or ""
+    snapped = snap_table(table, catalog, intent.get("filters"))
+    if snapped and snapped != table:
+        intent["table"] = snapped
+        intent["snapped_from"] = table
+
+
+def llm_parse_text_intent(client, question, cache=INTENT_CACHE, fallback=None,
+                          stream=STREAM_INTENTS, on_field=None, catalog=None):
+    """
+    Text intent from the LLM, asked through a chatbot.ResilientChatClient
+    (its model is the deployment). When the client gives up (LLMUnavailable:
+    deadline blown or circuit open), `fallback(question)` answers instead
+    if given; fallback intents are not cached.
+    With stream=True, on_field(key, value) is called for each top-level
+    field as soon as it arrives (e.g. to start loading the "table").
+    With a table_catalog(), the prompt only offers the tables of that
+    catalog and the returned table is snapped to the nearest existing one.
+    """
+    prompt = TEXT_INTENT_PROMPT if catalog is None else build_intent_prompt(catalog)
+    key = cache_key(question, client.model, prompt)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    try:
+        if stream:
+            raw_intent = _stream_intent(client, prompt, question, on_field)
+        else:
+            raw_intent = _complete_intent(client, prompt, question)
+    except LLMUnavailable:
+        if fallback is None:
+            raise
+        intent = fallback(question)
+        intent["source"] = "fallback"
+        return intent
 
     # 🔥 HARD NORMALIZATION (CRITICAL)
     intent = {}
@@ -62,6 +164,9 @@ def llm_parse_text_intent(client, question):
         clean_key = k.replace('"', "").strip()
         intent[clean_key] = v
 
+    if catalog is not None:
+        _snap_intent(intent, catalog)
+
     # ✅ CONVERT TABLE TO DIMENSIONS
     table_name = intent.get("table", "")
     
@@ -77,5 +182,7 @@ def llm_parse_text_intent(client, question):
     if "filters" in intent:
         intent["filter_values"] = intent.pop("filters")
     
+    if cache is not None:
+        cache.put(key, intent)
 
     return intent
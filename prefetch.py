@@ -0,0 +1,187 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from data_loader import (
+    INGEST_WORKERS,
+    cache_workbook,
+    get_dataset,
+    is_cached,
+    mirror_key,
+    read_table,
+    version_workbooks,
+)
+from value_search import get_value_index
+
+# Loads single 2D tables ahead of the code that needs them
+_TABLE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="warm-table")
+
+# Guesses get their own pool so they never delay a table the LLM named
+_SPECULATIVE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speculative-table")
+
+# At most this many guessed tables per question: each one takes a slot
+# of the 2D table LRU (data_loader.MAX_RESIDENT_2D)
+MAX_SPECULATIVE_TABLES = 3
+
+
+def warm_table(version, table, pool=_TABLE_POOL):
+    """
+    Starts loading a 2D table (either orientation) in the background.
+    Returns the Future, or None when there is nothing to load:
+    1D tables are always resident.
+    """
+    tables_2d = get_dataset(version).tables_2d
+    for key in (table, mirror_key(table)):
+        if "_x_" in key and key in tables_2d:
+            return pool.submit(tables_2d.__getitem__, key)
+    return None
+
+
+def candidate_tables(intent, tables_2d, limit=MAX_SPECULATIVE_TABLES):
+    """
+    2D tables a rule-based intent points at, most likely first: pairs of
+    its dimensions, then pairs with the dimensions of the values it found.
+    """
+    dims = list(dict.fromkeys([*intent.get("dimensions", []), *intent.get("filter_values", {})]))
+    keys = []
+    for i, a in enumerate(dims):
+        for b in dims[i + 1:]:
+            key = f"{a}_x_{b}"
+            if key in tables_2d or mirror_key(key) in tables_2d:
+                keys.append(key)
+    return keys[:limit]
+
+
+def warm_candidates(version, intent, limit=MAX_SPECULATIVE_TABLES):
+    """
+    Starts loading the candidate_tables() of a rule-based intent while the
+    LLM works out the real one. Returns the Futures for discard_warmups().
+    """
+    tables_2d = get_dataset(version).tables_2d
+    futures = (warm_table(version, key, _SPECULATIVE_POOL) for key in candidate_tables(intent, tables_2d, limit))
+    return [f for f in futures if f is not None]
+
+
+def discard_warmups(futures):
+    """
+    Drops the guesses that have not started yet; loads already running
+    finish into the LRU, where unused ones are the first to be evicted.
+    """
+    for future in futures:
+        future.cancel()
+
+
+class PrefetchJob:
+    """
+    Progress of one background warm-up: state is one of
+    "running", "done", "cancelled" or "failed".
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.state = "running"
+        self.done = 0
+        self.total = 0
+        self.error = None
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def snapshot(self):
+        return {
+            "version": self.version,
+            "state": self.state,
+            "done": self.done,
+            "total": self.total,
+            "fraction": self.done / self.total if self.total else (1.0 if self.state == "done" else 0.0),
+            "error": self.error,
+        }
+
+
+class VersionPrefetcher:
+    """
+    Warms data versions on background threads: parses every uncached
+    workbook into the Parquet cache, then loads the shared Dataset and the
+    dimension-value index, so switching to that version does not block.
+    Workbooks are parsed in a process pool when workers > 1.
+    """
+
+    def __init__(self, workers=INGEST_WORKERS):
+        self.workers = workers
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, version):
+        """
+        Starts warming `version` unless it is already running or done.
+        """
+        version = version.capitalize()
+        with self._lock:
+            job = self._jobs.get(version)
+            if job is not None and job.state in ("running", "done"):
+                return job
+
+            job = PrefetchJob(version)
+            job._thread = threading.Thread(
+                target=self._run, args=(job,), name=f"prefetch-{version}", daemon=True
+            )
+            self._jobs[version] = job
+            job._thread.start()
+            return job
+
+    def cancel(self, version=None):
+        with self._lock:
+            jobs = list(self._jobs.values()) if version is None else [self._jobs.get(version.capitalize())]
+        for job in jobs:
+            if job is not None:
+                job.cancel()
+
+    def progress(self):
+        with self._lock:
+            return {v: job.snapshot() for v, job in self._jobs.items()}
+
+    def job(self, version):
+        with self._lock:
+            return self._jobs.get(version.capitalize())
+
+    def _run(self, job):
+        try:
+            missing = [p for p in version_workbooks(job.version) if not is_cached(p)]
+            job.total = len(missing)
+
+            if self.workers <= 1 or len(missing) <= 1:
+                for path in missing:
+                    if job._cancel.is_set():
+                        break
+                    read_table(path)
+                    job.done += 1
+            else:
+                ctx = multiprocessing.get_context("spawn")
+                pool = ProcessPoolExecutor(max_workers=min(self.workers, len(missing)), mp_context=ctx)
+                try:
+                    futures = [pool.submit(cache_workbook, path) for path in missing]
+                    for future in as_completed(futures):
+                        if job._cancel.is_set():
+                            break
+                        future.result()
+                        job.done += 1
+                finally:
+                    pool.shutdown(wait=True, cancel_futures=True)
+
+            if job._cancel.is_set():
+                job.state = "cancelled"
+                return
+
+            get_dataset(job.version)
+            get_value_index(job.version)
+            job.state = "done"
+
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.state = "failed"
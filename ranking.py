@@ -0,0 +1,243 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import get_cube
+from table_index import dimension_columns, filter_positions, get_index, match_filters
+from trends import YEARS
+from utils import resolve_measure_column
+
+DEFAULT_TOP_N = 10
+
+PLURALS = {
+    "city": "cities",
+    "country": "countries",
+    "industry": "industries",
+    "years_of_experience": "experience levels",
+}
+
+
+SINGULARS = {
+    "years_of_experience": "experience level",
+}
+
+
+def plural(dim):
+    return PLURALS.get(dim, dim.replace("_", " ") + "s")
+
+
+def singular(dim):
+    return SINGULARS.get(dim, dim.replace("_", " "))
+
+
+def top_ids(scores, n, ascending=False):
+    """
+    Positions of the n largest (or smallest) non-NaN scores, best first.
+    np.argpartition selects them in linear time; only those n get sorted.
+    """
+    key = np.asarray(scores, dtype=np.float64)
+    key = key if ascending else -key
+    valid = np.flatnonzero(~np.isnan(key))
+    n = min(n, len(valid))
+    if n <= 0:
+        return valid[:0]
+
+    k = key[valid]
+    pick = np.argpartition(k, n - 1)[:n] if n < len(valid) else np.arange(len(valid))
+    # Ties keep the table's value order
+    pick = pick[np.lexsort((valid[pick], k[pick]))]
+    return valid[pick]
+
+
+def value_means(df, col, measure, filters=None):
+    """
+    (values, means): the mean of `measure` for every value of `col` over
+    the rows matching `filters` ({column: value}). Straight from the
+    AggregateCube without filters, one bincount over the slice otherwise.
+    Avg Rate means of exactly 0 are NaN: a 0 rate marks a cell with no data.
+    """
+    index = get_index(df)
+    values = index.values(col)
+
+    if not filters:
+        means = get_cube(df).marginal_means(col, measure)
+    else:
+        positions = None
+        for c, v in filters.items():
+            positions = filter_positions(index, c, v, positions)
+
+        ids = index.row_ids(col)[positions]
+        data = np.asarray(df[measure].iloc[positions], dtype=np.float64)
+        keep = (ids >= 0) & ~np.isnan(data)
+        sums = np.bincount(ids[keep], weights=data[keep], minlength=len(values))
+        counts = np.bincount(ids[keep], minlength=len(values))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = np.where(counts > 0, sums / counts, np.nan)
+
+    if "Avg Rate" in measure:
+        means = np.where(means == 0, np.nan, means)
+    return values, means
+
+
+def rank_values(df, col, measure, n=DEFAULT_TOP_N, ascending=False, filters=None):
+    """
+    Top-n (bottom-n with ascending=True) [(value, mean)] of `col` by `measure`.
+    """
+    values, means = value_means(df, col, measure, filters)
+    return [(values[i], means[i]) for i in top_ids(means, n, ascending)]
+
+
+def percentile_rank(df, col, measure, value, filters=None):
+    """
+    Share (%) of the values of `col` whose mean is at or below the mean of
+    `value`, or None when `value` has no data.
+    """
+    values, means = value_means(df, col, measure, filters)
+    vid = get_index(df).value_id(col, value)
+    if vid < 0 or np.isnan(means[vid]):
+        return None
+    valid = means[~np.isnan(means)]
+    return float((valid <= means[vid]).sum() / len(valid) * 100)
+
+
+# -------------------------------------------------
+# Question routing
+# -------------------------------------------------
+def ranking_table(tables_1d, tables_2d, rank_dim, filter_values):
+    """
+    Picks the table a ranking question runs on: the 1D table of the ranked
+    dimension, or the 2D table pairing it with the filtered one.
+    Returns (df, ranked column, filters on the other column) or None; the
+    tables pair two dimensions, so at most one other can be filtered.
+    """
+    others = filtered_dimensions(rank_dim, filter_values)
+    if len(others) > 1:
+        return None
+    if not others:
+        df = tables_1d.get(rank_dim)
+        return None if df is None else (df, "Dimension Value", {})
+
+    other = others[0]
+    for key, col in (
+        (f"{rank_dim}_x_{other}", "Dimension1 Value"),
+        (f"{other}_x_{rank_dim}", "Dimension2 Value"),
+    ):
+        if key in tables_2d:
+            return tables_2d[key], col, {other: filter_values[other]}
+    return None
+
+
+def filtered_dimensions(rank_dim, filter_values):
+    """
+    The dimensions other than the ranked one that have a filter value.
+    """
+    return [d for d in filter_values if d != rank_dim and filter_values[d]]
+
+
+def rank_dimension(intent):
+    """
+    The dimension a ranking question ranks: the one named right after
+    top/bottom ("top 10 cities for Health Care"), else the first detected
+    one without a filter value, else the first.
+    """
+    named = (intent.get("ranking") or {}).get("dimension")
+    if named:
+        return named
+    dims = intent.get("dimensions", [])
+    filter_values = intent.get("filter_values", {})
+    return next((d for d in dims if not filter_values.get(d)), dims[0] if dims else None)
+
+
+def _resolve(tables_1d, tables_2d, intent, version):
+    """
+    Shared setup of the ranking answers: (df, col, measure, filters,
+    label, ranked dimension) or a warning string.
+    """
+    rank_dim = rank_dimension(intent)
+    year = intent.get("year") or YEARS[-1]
+    metric = intent.get("metric")
+    if not rank_dim:
+        return "⚠️ Please name the dimension to rank (city, industry, role, …)."
+
+    # Rather than drop a filter and answer for the others
+    others = filtered_dimensions(rank_dim, intent.get("filter_values", {}))
+    if len(others) > 1:
+        named = " and ".join(f"`{intent['filter_values'][d]}`" for d in others)
+        return (
+            f"⚠️ {plural(rank_dim).capitalize()} can only be ranked within one other dimension, "
+            f"but {named} were both given. Please keep one of them."
+        )
+
+    found = ranking_table(tables_1d, tables_2d, rank_dim, intent.get("filter_values", {}))
+    if found is None:
+        return f"⚠️ No table ranks `{rank_dim}` with these filters."
+    df, col, filter_values = found
+
+    measure = resolve_measure_column(df, year, metric, version)
+    if not measure:
+        return f"⚠️ Measure `{year} {metric}` not available."
+
+    other_cols = [c for c in dimension_columns(df) if c != col]
+    filters, unmatched = match_filters(df, filter_values, other_cols)
+    if unmatched:
+        return f"⚠️ No data found for `{unmatched[0]}`."
+
+    label = f"**{year} {metric}**"
+    if filters:
+        label += f" for **{' × '.join(filters.values())}**"
+    return df, col, measure, filters, label, rank_dim
+
+
+def generate_ranking_answer(tables_1d, tables_2d, intent, version):
+    """
+    Text answer for top-N / bottom-N / percentile questions.
+    """
+    resolved = _resolve(tables_1d, tables_2d, intent, version)
+    if isinstance(resolved, str):
+        return resolved
+    df, col, measure, filters, label, rank_dim = resolved
+    ranking = intent.get("ranking") or {}
+    dims = plural(rank_dim)
+
+    if ranking.get("order") == "percentile":
+        target = intent.get("filter_values", {}).get(rank_dim)
+        value = get_index(df).match(col, target) if target else None
+        if value is None:
+            return f"⚠️ Please name the {rank_dim.replace('_', ' ')} to place."
+        pct = percentile_rank(df, col, measure, value, filters)
+        if pct is None:
+            return f"⚠️ No {label} data for **{value}** ({version})."
+        return f"📊 **{value}** is at the **{round(pct, 1)}th percentile** of {dims} by {label} ({version})."
+
+    bottom = ranking.get("order") == "bottom"
+    n = ranking.get("n") or DEFAULT_TOP_N
+    ranked = rank_values(df, col, measure, n, ascending=bottom, filters=filters)
+    if not ranked:
+        return f"⚠️ No {label} data to rank ({version})."
+
+    if n == 1:
+        value, mean = ranked[0]
+        best = "Lowest" if bottom else "Highest"
+        return f"🏆 {best} {singular(rank_dim)} by {label} ({version}): **{value}** — **{round(mean, 2)}**"
+
+    lines = "\n".join(f"{i}. {value} — **{round(mean, 2)}**" for i, (value, mean) in enumerate(ranked, 1))
+    return f"🏆 {'Bottom' if bottom else 'Top'} {len(ranked)} {dims} by {label} ({version}):\n\n{lines}"
+
+
+def ranking_frame(tables_1d, tables_2d, intent, version):
+    """
+    (frame, measure) for a ranking chart: one row per ranked value, best first.
+    """
+    resolved = _resolve(tables_1d, tables_2d, intent, version)
+    if isinstance(resolved, str):
+        raise ValueError(resolved.replace("⚠️ ", ""))
+    df, col, measure, filters, _, rank_dim = resolved
+    ranking = intent.get("ranking") or {}
+
+    ranked = rank_values(
+        df, col, measure,
+        ranking.get("n") or DEFAULT_TOP_N,
+        ascending=ranking.get("order") == "bottom",
+        filters=filters,
+    )
+    frame = pd.DataFrame(ranked, columns=[rank_dim.replace("_", " ").title(), measure])
+    return frame, measure
@@ -1,15 +1,13 @@
 import streamlit as st
 
-from data_loader import load_all_tables, load_all_2d_tables
-from chatbot import get_chatbot_client
-from intent_parser import parse_intent
-from llm_text_intent import llm_parse_text_intent
-from text_answers import generate_text_answer, generate_2d_text_answer
-from visualizations import plot_generic
-from utils import resolve_measure_column
+from chatbot import llm_config
+from engine import QueryEngine, VERSIONS
 
 DEBUG = True
 
+# Messages rendered in full on every rerun; older ones are collapsed
+RECENT_MESSAGES = 8
+
 # ---------------- PAGE CONFIG ----------------
 st.set_page_config(
     page_title="LegalVIEW Analytics Chatbot",
@@ -26,18 +24,32 @@ if "version" not in st.session_state:
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
-if "DATA_1D" not in st.session_state:
-    st.session_state.DATA_1D = None
-
-if "DATA_2D" not in st.session_state:
-    st.session_state.DATA_2D = None
+# Indexes of collapsed chart messages the user opened
+if "opened_charts" not in st.session_state:
+    st.session_state.opened_charts = set()
 
-# ---------------- LOAD CLIENT ----------------
+# ---------------- LOAD ENGINE ----------------
+# One engine per process: data, caches and the LLM client are shared by
+# every session. Both versions warm up in the background, so version
+# switches don't block.
 @st.cache_resource
-def get_client():
-    return get_chatbot_client()
-
-client = get_client()
+def get_engine():
+    engine = QueryEngine(config=llm_config(st.secrets))
+    engine.prefetch(VERSIONS)
+    return engine
+
+engine = get_engine()
+
+with st.sidebar:
+    running = False
+    for v, p in engine.prefetcher.progress().items():
+        if p["state"] == "running":
+            running = True
+            st.progress(p["fraction"], text=f"Preparing {v} data… {p['done']}/{p['total']}")
+        elif p["state"] == "failed":
+            st.caption(f"⚠️ {v} background load failed: {p['error']}")
+    if running and st.button("Stop background loading"):
+        engine.prefetcher.cancel()
 
 # ---------------- VERSION SELECTION ----------------
 st.markdown("### 📅 Choose Data Version")
@@ -47,16 +59,14 @@ col1, col2 = st.columns(2)
 with col1:
     if st.button("📘 Jun", use_container_width=True):
         st.session_state.version = "Jun"
-        st.session_state.DATA_1D = load_all_tables("Jun")
-        st.session_state.DATA_2D = load_all_2d_tables("Jun")
         st.session_state.messages = []
+        st.session_state.opened_charts = set()
 
 with col2:
     if st.button("📙 Sep", use_container_width=True):
         st.session_state.version = "Sep"
-        st.session_state.DATA_1D = load_all_tables("Sep")
-        st.session_state.DATA_2D = load_all_2d_tables("Sep")
         st.session_state.messages = []
+        st.session_state.opened_charts = set()
 
 if not st.session_state.version:
     st.info("Please select a data version to start.")
@@ -64,18 +74,70 @@ if not st.session_state.version:
 
 st.success(f"✅ Using {st.session_state.version} data")
 
-DATA_1D = st.session_state.DATA_1D
-DATA_2D = st.session_state.DATA_2D
 version = st.session_state.version
 
+if DEBUG:
+    stats = engine.stats()
+    st.sidebar.caption(f"LLM circuit: {stats['llm_circuit']}")
+    st.sidebar.caption(f"Intent cache: {stats['intent_cache']}")
+    st.sidebar.caption(f"Figure cache: {stats['figure_cache']}")
+
 # ---------------- CHAT HISTORY ----------------
-for idx, msg in enumerate(st.session_state.messages):
+# Plot messages hold a chart spec and figure-cache key, not the figure
+def show_message(idx, msg, collapsed=False):
     with st.chat_message(msg["role"]):
         if msg["type"] == "text":
             st.markdown(msg["content"])
         elif msg["type"] == "plot":
+            if collapsed and idx not in st.session_state.opened_charts:
+                if not st.button(f"📈 Show chart: {msg['title']}", key=f"open_chart_{idx}"):
+                    return
+                st.session_state.opened_charts.add(idx)
+            try:
+                fig = engine.figure(msg["key"], msg["spec"])
+            except (KeyError, ValueError) as e:
+                st.warning(f"⚠️ Chart no longer available: {str(e)}")
+                return
             # Add unique key based on message index
-            st.plotly_chart(msg["content"], use_container_width=True, key=f"plot_history_{idx}")
+            st.plotly_chart(fig, use_container_width=True, key=f"plot_history_{idx}")
+
+
+def show_reply(reply):
+    """
+    Renders a new engine reply and records it in the history
+    (charts by reference).
+    """
+    with st.chat_message("assistant"):
+        if reply["type"] == "plot":
+            # Add unique key based on current message count
+            st.plotly_chart(reply["figure"], use_container_width=True, key=f"plot_new_{len(st.session_state.messages)}")
+        elif reply["level"] == "warning":
+            st.warning(reply["content"])
+        elif reply["level"] == "error":
+            st.error(reply["content"])
+            if DEBUG and reply["exception"] is not None:
+                st.exception(reply["exception"])
+        else:
+            st.markdown(reply["content"])
+
+    if reply["type"] == "plot":
+        st.session_state.messages.append(
+            {"role": "assistant", "type": "plot", "spec": reply["spec"], "key": reply["key"], "title": reply["title"]}
+        )
+    else:
+        st.session_state.messages.append(
+            {"role": "assistant", "type": "text", "content": reply["content"]}
+        )
+
+
+messages = st.session_state.messages
+older = len(messages) - RECENT_MESSAGES
+if older > 0:
+    with st.expander(f"Earlier messages ({older})"):
+        for idx in range(older):
+            show_message(idx, messages[idx], collapsed=True)
+for idx in range(max(older, 0), len(messages)):
+    show_message(idx, messages[idx])
 
 # ---------------- USER INPUT ----------------
 query = st.chat_input("Ask about rates, counts, trends, or visuals…")
@@ -89,111 +151,4 @@ if query:
     with st.chat_message("user"):
         st.markdown(query)
 
-    # ---------------- RULE-BASED (VISUAL) ----------------
-    rule = parse_intent(query)
-
-    if rule["chart"]:
-        dims = rule.get("dimensions", [])
-
-        if len(dims) == 1:
-            df = DATA_1D.get(dims[0])
-            if df is None:
-                msg = f"⚠️ 1D table `{dims[0]}` not available."
-            else:
-                measure_col = resolve_measure_column(df, rule["year"], rule["metric"], version)
-                if not measure_col:
-                    msg = f"⚠️ Measure column not found for {rule['year']} {rule['metric']}."
-                else:
-                    try:
-                        msg = plot_generic(df, measure_col, rule["chart"])
-                    except ValueError as e:
-                        msg = f"⚠️ Visualization error: {str(e)}"
-
-        elif len(dims) == 2:
-            # Try both possible 2D table key formats
-            key1 = "_x_".join(dims)
-            key2 = "_x_".join(reversed(dims))
-            
-            df = DATA_2D.get(key1)
-            if df is None:
-                df = DATA_2D.get(key2)
-            
-            if df is None:
-                msg = f"⚠️ 2D table `{key1}` not available."
-            else:
-                measure_col = resolve_measure_column(df, rule["year"], rule["metric"], version)
-                if not measure_col:
-                    msg = f"⚠️ Measure column not found for {rule['year']} {rule['metric']}."
-                else:
-                    try:
-                        msg = plot_generic(df, measure_col, rule["chart"])
-                    except ValueError as e:
-                        msg = f"⚠️ Visualization error: {str(e)}"
-
-        else:
-            msg = f"⚠️ Detected {len(dims)} dimensions. Expected 1 or 2."
-
-        with st.chat_message("assistant"):
-            if isinstance(msg, str):
-                st.warning(msg)
-            else:
-                # Add unique key based on current message count
-                st.plotly_chart(msg, use_container_width=True, key=f"plot_new_{len(st.session_state.messages)}")
-
-        st.session_state.messages.append(
-            {"role": "assistant", "type": "plot" if not isinstance(msg, str) else "text", "content": msg}
-        )
-
-    # ---------------- LLM TEXT ANSWER ----------------
-    else:
-        try:
-            intent = llm_parse_text_intent(client, query)
-
-            dims = intent.get("dimensions", [])
-
-            # -------- 1D TEXT --------
-            if len(dims) == 1:
-                df = DATA_1D.get(dims[0])
-
-                if df is None:
-                    answer = f"⚠️ 1D table `{dims[0]}` not available."
-                else:
-                    answer = generate_text_answer(df, intent, version)
-
-            # -------- 2D TEXT --------
-            elif len(dims) == 2:
-                # Try both possible key orders
-                key1 = "_x_".join(dims)
-                key2 = "_x_".join(reversed(dims))
-                
-                df = DATA_2D.get(key1)
-                if df is None:
-                    df = DATA_2D.get(key2)
-
-                if df is None:
-                    answer = f"⚠️ 2D table for `{' × '.join(dims)}` is not available."
-                else:
-                    answer = generate_2d_text_answer(df, intent, version)
-
-            else:
-                answer = f"⚠️ Detected {len(dims)} dimensions. Expected 1 or 2."
-
-            with st.chat_message("assistant"):
-                st.markdown(answer)
-
-            st.session_state.messages.append(
-                {"role": "assistant", "type": "text", "content": answer}
-            )
-
-        except Exception as e:
-            error_msg = f"⚠️ Error: {type(e).__name__}: {str(e)}"
-
-            if DEBUG:
-                st.exception(e)
-
-            with st.chat_message("assistant"):
-                st.error(error_msg)
-
-            st.session_state.messages.append(
-                {"role": "assistant", "type": "text", "content": error_msg}
-            )
\ No newline at end of file
+    show_reply(engine.answer(query, version))
@@ -0,0 +1,65 @@
+import difflib
+import re
+from collections import namedtuple
+
+from intent_parser import DIMENSION_MAP
+
+# The tables of one version: 1D dimension names and the unordered pairs
+# that have a 2D table (in either orientation)
+Catalog = namedtuple("Catalog", ["dims", "pairs", "keys_2d"])
+
+
+def table_catalog(tables_1d, tables_2d):
+    """
+    Catalog of a loaded dataset. Hashable, so prompts built from it can be cached.
+    """
+    dims = tuple(sorted(tables_1d))
+    pairs = tuple(sorted({tuple(sorted(key.split("_x_"))) for key in tables_2d}))
+    return Catalog(dims, pairs, frozenset(tables_2d))
+
+
+def snap_dimension(name, catalog):
+    """
+    Nearest 1D dimension to a name the LLM used ("Practice Area",
+    "cities", "practise_area"), or None.
+    """
+    if not name:
+        return None
+    clean = re.sub(r"[\s\-]+", "_", str(name).strip().lower())
+    if clean in catalog.dims:
+        return clean
+    mapped = DIMENSION_MAP.get(clean.replace("_", " "))
+    if mapped in catalog.dims:
+        return mapped
+    close = difflib.get_close_matches(clean, catalog.dims, n=1, cutoff=0.75)
+    return close[0] if close else None
+
+
+def snap_table(table, catalog, filters=None):
+    """
+    Nearest existing table key to the one the LLM returned, or None.
+
+    Dimension names are snapped first, a 2D key is turned around when
+    only its mirror exists, and a pair with no 2D table in this version
+    falls back to the 1D table of its filtered dimension (of the first
+    one without filters). With filters on both dimensions there is no
+    table that keeps them all, so None.
+    """
+    if not table:
+        return None
+    parts = [snap_dimension(p, catalog) for p in re.split(r"_x_|\s+x\s+|×", str(table).strip(), flags=re.IGNORECASE)]
+    dims = list(dict.fromkeys(p for p in parts if p))
+
+    if len(dims) == 1:
+        return dims[0]
+    if len(dims) != 2:
+        return None
+
+    for key in ("_x_".join(dims), "_x_".join(reversed(dims))):
+        if key in catalog.keys_2d:
+            return key
+
+    filtered = [d for d in dims if d in (filters or {}) and (filters or {})[d]]
+    if len(filtered) == 2:
+        return None
+    return filtered[0] if filtered else dims[0]
@@ -0,0 +1,221 @@
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from fuzzy_match import ValueMatcher
+
+
+_EMPTY = np.empty(0, dtype=np.intp)
+
+
+class ValueIndex:
+    """
+    Maps every dimension value of a table to the row positions holding it.
+    Built once per table from the categorical codes of its non-numeric columns,
+    so a filter becomes a dict lookup instead of a full string comparison.
+    """
+
+    def __init__(self, df=None):
+        # column -> (values in first-appearance order, codes, {value: positions},
+        #            code -> position in values)
+        self._columns = {}
+        self._matchers = {}
+        if df is None:
+            return
+
+        for c in df.columns:
+            s = df[c]
+            if pd.api.types.is_numeric_dtype(s):
+                continue
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                s = s.astype("category")
+
+            codes = s.cat.codes.to_numpy()
+            categories = s.cat.categories
+
+            # Stable sort keeps positions ascending within each value
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(-1, len(categories) + 1))
+
+            positions = {}
+            first_seen = []
+            for code in range(len(categories)):
+                rows = order[bounds[code + 1]:bounds[code + 2]]
+                if len(rows):
+                    value = str(categories[code])
+                    positions[value] = rows
+                    first_seen.append((rows[0], value))
+
+            values = [v for _, v in sorted(first_seen)]
+            # Trailing -1 catches missing values (code -1)
+            value_ids = np.full(len(categories) + 1, -1, dtype=np.int64)
+            for i, v in enumerate(values):
+                value_ids[categories.get_loc(v)] = i
+            self._columns[c] = (values, codes, positions, value_ids)
+
+    def __contains__(self, col):
+        return col in self._columns
+
+    def positions(self, col, value):
+        """
+        Ascending row positions where `col == value` (empty if absent).
+        """
+        return self._columns[col][2].get(str(value), _EMPTY)
+
+    def value_ids(self, col, positions=None):
+        """
+        Positions into values(col) of the distinct values present,
+        in first-appearance order, optionally restricted to some rows.
+        """
+        values, codes, _, value_ids = self._columns[col]
+        if positions is None:
+            return np.arange(len(values))
+        ids = pd.unique(value_ids[codes[positions]])
+        return ids[ids >= 0]
+
+    def values(self, col, positions=None):
+        """
+        Distinct values of `col` in first-appearance order,
+        optionally restricted to a set of row positions.
+        """
+        values = self._columns[col][0]
+        return [values[i] for i in self.value_ids(col, positions)]
+
+    def matcher(self, col):
+        matcher = self._matchers.get(col)
+        if matcher is None:
+            matcher = ValueMatcher(self._columns[col][0])
+            self._matchers[col] = matcher
+        return matcher
+
+    def match(self, col, target_value, positions=None):
+        """
+        Fuzzy-matches `target_value` against the values of `col`
+        present in `positions` (see text_answers.best_match).
+        """
+        return self.matcher(col).best(target_value, self.value_ids(col, positions))
+
+    def row_ids(self, col):
+        """
+        Per-row position of each value in values(col); -1 where missing.
+        """
+        _, codes, _, value_ids = self._columns[col]
+        return value_ids[codes]
+
+    def value_id(self, col, value):
+        """
+        Position of `value` in values(col), or -1 if absent.
+        """
+        rows = self.positions(col, value)
+        if not len(rows):
+            return -1
+        _, codes, _, value_ids = self._columns[col]
+        return int(value_ids[codes[rows[0]]])
+
+    def renamed(self, mapping):
+        """
+        Same index under different column names (used for mirrored tables).
+        """
+        out = ValueIndex()
+        out._columns = {mapping.get(c, c): entry for c, entry in self._columns.items()}
+        out._matchers = {mapping.get(c, c): m for c, m in self._matchers.items()}
+        return out
+
+
+class FrameRegistry:
+    """
+    Per-DataFrame cache of a derived structure (index, aggregates, ...).
+    Entries are keyed by id(df) and dropped when the DataFrame is collected.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        # id(df) -> (weakref to df, structure)
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    def get(self, df):
+        with self._lock:
+            entry = self._entries.get(id(df))
+            if entry is not None and entry[0]() is df:
+                return entry[1]
+
+        value = self.build(df)
+        self.register(df, value)
+        return value
+
+    def register(self, df, value):
+        key = id(df)
+
+        def _drop(ref):
+            with self._lock:
+                if key in self._entries and self._entries[key][0] is ref:
+                    del self._entries[key]
+
+        with self._lock:
+            self._entries[key] = (weakref.ref(df, _drop), value)
+
+
+_INDEXES = FrameRegistry(ValueIndex)
+
+
+def get_index(df):
+    """
+    Returns the ValueIndex of a table, building it on first use.
+    Indexes live as long as the DataFrame they describe.
+    """
+    return _INDEXES.get(df)
+
+
+def register_index(df, index):
+    _INDEXES.register(df, index)
+
+
+def filter_positions(index, col, value, positions=None):
+    """
+    Narrows `positions` (None = every row) to rows where `col == value`.
+    """
+    rows = index.positions(col, value)
+    if positions is None:
+        return rows
+    return np.intersect1d(positions, rows, assume_unique=True)
+
+
+def take_rows(df, positions):
+    return df if positions is None else df.iloc[positions]
+
+
+def dimension_columns(df):
+    """
+    The dimension value columns of a 1D or 2D table.
+    """
+    if "Dimension1 Value" in df.columns and "Dimension2 Value" in df.columns:
+        return ["Dimension1 Value", "Dimension2 Value"]
+    return ["Dimension Value"]
+
+
+def match_filters(df, filter_values, columns=None):
+    """
+    Fuzzy-matches filter values against the table's dimension columns
+    (or `columns`), trying them in order within the rows of earlier
+    matches, as generate_2d_text_answer does.
+    Returns ({column: value}, unmatched filter values).
+    """
+    index = get_index(df)
+    positions = None
+    matched = {}
+    unmatched = []
+    for val in filter_values.values():
+        if not val:
+            continue
+        for col in columns or dimension_columns(df):
+            value = index.match(col, val, positions)
+            if value is not None:
+                positions = filter_positions(index, col, value, positions)
+                matched[col] = value
+                break
+        else:
+            unmatched.append(val)
+    return matched, unmatched
@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+INTENT = '{"table": "city", "year": "2025", "metric": "Avg Rate", "filters": {"city": "Boston"}}'
+
+
+def completion(content):
+    return {
+        "id": "fake", "object": "chat.completion", "created": 0, "model": "dep",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+    }
+
+
+def chunk(content):
+    return {
+        "id": "fake", "object": "chat.completion.chunk", "created": 0, "model": "dep",
+        "choices": [{"index": 0, "finish_reason": None, "delta": {"content": content}}],
+    }
+
+
+class FakeLLM:
+    """
+    Local stand-in for an Azure OpenAI chat deployment.
+
+    Each request takes the next step of `plan` ("ok" once it is empty):
+    "ok", "slow" (answers after `slow_for` seconds) or an HTTP status,
+    optionally with a Retry-After value ("429:0.2").
+    Streamed requests get `content` then `trailing` as SSE chunks of
+    `chunk_size` characters, `chunk_delay` seconds apart; "drop" cuts the
+    connection after the first half of them.
+    """
+
+    def __init__(self, content=INTENT, slow_for=2.0, trailing="", chunk_size=8, chunk_delay=0.0):
+        self.content = content
+        self.slow_for = slow_for
+        self.trailing = trailing
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.sent_chunks = 0
+        self.plan = []
+        self.requests = []
+        self.ports = set()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                fake.requests.append(body)
+                fake.ports.add(self.client_address[1])
+                step = fake.plan.pop(0) if fake.plan else "ok"
+
+                if step == "slow":
+                    time.sleep(fake.slow_for)
+                    step = "ok"
+                try:
+                    if body.get("stream") and step in ("ok", "drop"):
+                        self._stream(drop=step == "drop")
+                    elif step == "ok":
+                        self._json(200, completion(fake.content))
+                    else:
+                        code, _, retry_after = step.partition(":")
+                        self._json(int(code), {"error": {"message": "fake error"}}, retry_after)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up first
+                    pass
+
+            def _json(self, code, payload, retry_after=""):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if retry_after:
+                    self.send_header("Retry-After", retry_after)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, drop=False):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                text = fake.content + fake.trailing
+                pieces = [text[i:i + fake.chunk_size] for i in range(0, len(text), fake.chunk_size)]
+                if drop:
+                    pieces = pieces[:len(pieces) // 2]
+                # Azure opens with a chunk without choices (content filter results)
+                events = [{"id": "", "object": "", "created": 0, "model": "", "choices": []}]
+                events += [chunk(piece) for piece in pieces]
+                for event in events:
+                    self._event(json.dumps(event))
+                    if event["choices"]:
+                        fake.sent_chunks += 1
+                        time.sleep(fake.chunk_delay)
+                if drop:
+                    # End the response without the final chunk
+                    self.close_connection = True
+                    return
+                self._event("[DONE]")
+                self._write_chunk(b"")
+
+            def _event(self, data):
+                self._write_chunk(f"data: {data}\n\n".encode("utf-8"))
+
+            def _write_chunk(self, data):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+        return Handler
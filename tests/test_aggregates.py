@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import comparison
+from aggregates import AggregateCube, check_cube, check_marginals, get_cube, register_cube
+from data_loader import compact_table, mirror_view
+from table_index import get_index, register_index
+
+NAN = np.nan
+RATE = "2025 Avg Rate Sep"
+COUNT = "2025 Matter Count Sep"
+SWAP = {"Dimension1 Value": "Dimension2 Value", "Dimension2 Value": "Dimension1 Value"}
+
+pytestmark = pytest.mark.filterwarnings("ignore:invalid value encountered:RuntimeWarning")
+
+
+def frame_1d():
+    return pd.DataFrame({
+        "Dimension Value": ["Boston", "Chicago", "Denver", "Boston", None, "Erie"],
+        RATE: [500.0, NAN, 0.0, 700.0, 900.0, NAN],
+        COUNT: [3.0, NAN, NAN, NAN, 1.0, NAN],
+    })
+
+
+def frame_2d():
+    # Zero-filled like the pivot exports, with gaps and a row without a role
+    df = pd.DataFrame({
+        "Dimension1 Value": ["Boston", "Boston", "Chicago", "Chicago", "Denver", "Denver", "Erie"],
+        "Dimension2 Value": ["Partner", "Associate", "Partner", None, "Associate", "Counsel", "Counsel"],
+        RATE: [800.0, 0.0, 650.5, 410.0, 0.0, 0.0, NAN],
+        COUNT: [NAN, 12.0, NAN, NAN, 4.0, NAN, NAN],
+    })
+    return compact_table(df)
+
+
+def mirrored(df):
+    """
+    A mirror view served like LazyTableMap does: index and cube renamed.
+    """
+    view = mirror_view(df)
+    index = get_index(df).renamed(SWAP)
+    register_index(view, index)
+    register_cube(view, get_cube(df).renamed(SWAP, index))
+    return view
+
+
+@pytest.mark.parametrize("make", [frame_1d, frame_2d, lambda: mirrored(frame_2d())])
+def test_cube_matches_pandas(make):
+    df = make()
+    assert check_cube(df) == []
+    assert check_marginals(df) == []
+
+
+def test_fresh_cube_matches_registered_one():
+    df = frame_2d()
+    assert check_cube(df, AggregateCube(df)) == []
+
+
+def test_swapped_comparison_matches_pandas(monkeypatch):
+    base = frame_2d()
+    target = frame_2d()
+    target[RATE] = pd.arrays.SparseArray([820.0, 300.0, NAN, 400.0, 0.0, 0.0, 10.0], fill_value=0.0)
+    datasets = {
+        "Jun": SimpleNamespace(signature="jun", tables_1d={}, tables_2d={"city_x_role": base}),
+        # The target version only has the other orientation
+        "Sep": SimpleNamespace(signature="sep", tables_1d={}, tables_2d={"role_x_city": mirrored(target)}),
+    }
+    monkeypatch.setattr(comparison, "get_dataset", datasets.__getitem__)
+
+    moves = comparison.VersionComparison("Jun", "Sep").compare("city_x_role", "2025", "Avg Rate")
+
+    for version, df in (("Jun", base), ("Sep", target)):
+        expected = df.groupby("Dimension1 Value", observed=True)[RATE].mean()
+        got = moves.set_index("Dimension1 Value")[version]
+        for city, mean in expected.items():
+            assert got[city] == pytest.approx(mean, nan_ok=True)
@@ -0,0 +1,108 @@
+import re
+import time
+
+import openai
+import pytest
+
+from chatbot import CircuitBreaker, LLMConfig, LLMUnavailable, get_chatbot_client
+from llm_text_intent import llm_parse_text_intent
+
+MESSAGES = [{"role": "user", "content": "x"}]
+
+
+def client_for(server, **options):
+    config = LLMConfig(endpoint=server.url, api_key="k", api_version="2024-06-01", deployment="dep")
+    return get_chatbot_client(config, **options)
+
+
+def test_retries_5xx_and_429(fake_llm):
+    client = client_for(fake_llm)
+    fake_llm.plan[:] = ["500", "429:0.2", "ok"]
+
+    intent = llm_parse_text_intent(client, "boston rate 2025", cache=None, stream=False)
+
+    assert intent["dimensions"] == ["city"]
+    assert len(fake_llm.requests) == 3
+    assert client.breaker.state == "closed"
+
+
+def test_reuses_one_connection(fake_llm):
+    client = client_for(fake_llm)
+    for _ in range(5):
+        client.create(messages=MESSAGES)
+    assert len(fake_llm.ports) == 1
+
+
+def test_deadline_falls_back(fake_llm):
+    client = client_for(fake_llm, deadline=1.0, attempt_timeout=0.5)
+    fake_llm.plan[:] = ["slow"] * 10
+
+    start = time.monotonic()
+    intent = llm_parse_text_intent(
+        client, "q", cache=None, stream=False,
+        fallback=lambda q: {"dimensions": [], "confidence": 0.0},
+    )
+
+    assert intent["source"] == "fallback"
+    assert time.monotonic() - start < 2.0
+
+
+def test_breaker_opens_fails_fast_and_recovers(fake_llm):
+    breaker = CircuitBreaker(failure_threshold=2, reset_after=0.5)
+    client = client_for(fake_llm, deadline=2.0, max_attempts=1, breaker=breaker)
+    fake_llm.plan[:] = ["503", "503"]
+
+    for _ in range(2):
+        with pytest.raises(LLMUnavailable):
+            client.create(messages=MESSAGES)
+    assert breaker.state == "open"
+
+    sent = len(fake_llm.requests)
+    with pytest.raises(LLMUnavailable, match="circuit is open"):
+        client.create(messages=MESSAGES)
+    assert len(fake_llm.requests) == sent
+
+    time.sleep(0.6)
+    assert breaker.state == "half-open"
+    client.create(messages=MESSAGES)
+    assert breaker.state == "closed"
+
+
+def test_no_retry_on_400(fake_llm):
+    client = client_for(fake_llm)
+    fake_llm.plan[:] = ["400"]
+
+    with pytest.raises(openai.BadRequestError):
+        client.create(messages=MESSAGES)
+    assert len(fake_llm.requests) == 1
+    assert client.breaker.state == "closed"
+
+
+def test_engine_refuses_unsure_fallback(fake_llm):
+    from engine import FALLBACK_NOTE, FALLBACK_REFUSAL, FALLBACK_YEAR_NOTE, QueryEngine, text_reply
+    from intent_cache import IntentCache
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=60)
+    engine = QueryEngine(
+        client=client_for(fake_llm, deadline=1.0, max_attempts=1, breaker=breaker),
+        intent_cache=IntentCache(path=None),
+    )
+    fake_llm.plan[:] = ["503"]
+
+    # "Am" and "Law" are not understood by the rules
+    reply = engine.answer("What is the 2025 avg rate for the Am Law 100 firms?", "Sep")
+    assert reply["content"] == FALLBACK_REFUSAL
+
+    # Understood but yearless, so not confident enough to skip the LLM:
+    # answered for the latest year and marked as rule-based
+    reply = engine.answer("avg rate for partners in boston", "Sep")
+    assert reply["content"].endswith(FALLBACK_YEAR_NOTE.format(year="2025") + FALLBACK_NOTE)
+    answer = reply["content"].split("\n")[0]
+    assert re.search(r"\*\*\d+(\.\d+)?\*\*", answer)
+    assert answer == engine.answer("2025 avg rate for partners in boston", "Sep")["content"]
+
+    # Non-answers are not presented as answers
+    warning = "⚠️ No data found for the selected filters."
+    ctx = engine.context("Sep")
+    reply = engine._with_intent("avg rate for partners in boston", ctx, lambda intent: text_reply(warning))
+    assert reply["content"] == warning
@@ -0,0 +1,35 @@
+import pytest
+
+from engine import RULES_NEGATION, QueryEngine
+from intent_cache import IntentCache
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return QueryEngine(intent_cache=IntentCache(path=None))
+
+
+@pytest.mark.parametrize("question", [
+    "top 3 cities by 2025 avg rate excluding New York",
+    "show the avg rate trend for cities other than boston",
+    "plot 2025 avg rate by city except boston",
+])
+def test_rule_routes_refuse_negations(engine, question):
+    assert engine.answer(question, "Sep")["content"] == RULES_NEGATION
+
+
+def test_rule_routes_refuse_unknown_words(engine):
+    reply = engine.answer("top 5 cities by 2025 avg rate for am law 100 firms", "Sep")
+    assert reply["level"] == "warning"
+    assert "`firms`" in reply["content"]
+
+
+@pytest.mark.parametrize("question, kind", [
+    ("top 3 cities by 2025 avg rate", "text"),
+    ("how did avg rate for partners change over time", "text"),
+    ("plot 2025 avg rate by city", "plot"),
+])
+def test_rule_routes_still_answer(engine, question, kind):
+    reply = engine.answer(question, "Sep")
+    assert reply["type"] == kind
+    assert not reply.get("content", "").startswith("⚠️")
@@ -0,0 +1,61 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from engine import QueryEngine
+from engine_api import make_handler
+
+
+@pytest.fixture(scope="module")
+def api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(QueryEngine()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize("payload", [
+    [],
+    {"key": "x"},
+    {"spec": {"kind": "trend", "version": "../../etc"}},
+    {"spec": {"kind": "trend", "version": "Dec"}},
+    {"spec": {"kind": "trend"}},
+])
+def test_chart_rejects_bad_specs(api, payload):
+    code, body = post(api + "/chart", payload)
+    assert code == 400
+    assert "error" in body
+
+
+def test_chart_unknown_table_is_not_found(api):
+    code, body = post(api + "/chart", {"spec": {"kind": "generic", "version": "Sep", "table": "nope"}})
+    assert code == 404
+
+
+def test_chart_broken_spec_still_answers(api):
+    # Fails inside the figure code with neither KeyError nor ValueError
+    spec = {"kind": "trend", "version": "Sep", "table": "city", "intent": None}
+    code, body = post(api + "/chart", {"spec": spec})
+    assert code == 400
+    assert "error" in body
+
+
+def test_answer_unknown_version_is_an_error_reply():
+    reply = QueryEngine().answer("avg rate for partners in boston", "../../etc")
+    assert reply["type"] == "text"
+    assert reply["level"] == "error"
@@ -0,0 +1,29 @@
+import pytest
+
+from intent_parser import LOCAL_CONFIDENCE_THRESHOLD, has_negation, resolve_intent_locally
+from value_search import get_value_index
+
+
+@pytest.fixture(scope="module")
+def value_index():
+    return get_value_index("Sep")
+
+
+@pytest.mark.parametrize("question", [
+    "2025 avg rate for partners not in boston",
+    "2025 avg rate excluding partners",
+    "2025 avg rate for cities other than boston",
+    "2025 avg rate for matters that aren't litigation",
+])
+def test_negations_go_to_the_llm(value_index, question):
+    assert has_negation(question, value_index)
+    assert resolve_intent_locally(question, value_index)["confidence"] == 0
+
+
+@pytest.mark.parametrize("question", [
+    "2025 avg rate for non-litigation matters",
+    "2025 avg rate for Non-Litigation",
+])
+def test_negation_inside_a_value_is_not_one(value_index, question):
+    assert not has_negation(question, value_index)
+    assert resolve_intent_locally(question, value_index)["confidence"] >= LOCAL_CONFIDENCE_THRESHOLD
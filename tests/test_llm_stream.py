@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from chatbot import CircuitBreaker, LLMUnavailable
+from fake_llm import INTENT
+from llm_text_intent import llm_parse_text_intent
+from test_chatbot import client_for
+
+
+def fallback(question):
+    return {"dimensions": [], "confidence": 0.0}
+
+
+def test_returns_when_json_closes(fake_llm):
+    # ~2 s of text after the JSON object that should never be waited for
+    fake_llm.trailing = " Hope this helps!" * 10
+    fake_llm.chunk_delay = 0.1
+    fields = []
+
+    start = time.monotonic()
+    intent = llm_parse_text_intent(
+        client_for(fake_llm), "boston rate 2025", cache=None, stream=True,
+        on_field=lambda key, value: fields.append((key, fake_llm.sent_chunks)),
+    )
+
+    assert intent["dimensions"] == ["city"]
+    assert time.monotonic() - start < 1.5
+    # The table is known while the rest of the object is still on its way
+    assert fields[0][0] == "table"
+    assert fields[0][1] < len(INTENT) // fake_llm.chunk_size
+
+
+def test_deadline_covers_the_whole_stream(fake_llm):
+    # One token a second: the stream opens quickly but takes ~90 s to finish
+    fake_llm.chunk_size = 1
+    fake_llm.chunk_delay = 1.0
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=60)
+    client = client_for(fake_llm, deadline=3.0, attempt_timeout=2.0, breaker=breaker)
+
+    start = time.monotonic()
+    intent = llm_parse_text_intent(client, "q", cache=None, stream=True, fallback=fallback)
+
+    assert intent["source"] == "fallback"
+    assert time.monotonic() - start < 4.5
+    assert breaker.state == "open"
+
+
+def test_mid_stream_failure_counts_against_breaker(fake_llm):
+    fake_llm.plan[:] = ["drop"]
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=60)
+    client = client_for(fake_llm, breaker=breaker)
+
+    with pytest.raises(LLMUnavailable, match="stream failed"):
+        llm_parse_text_intent(client, "q", cache=None, stream=True)
+    assert breaker.state == "open"
@@ -0,0 +1,36 @@
+import pytest
+
+from data_loader import get_dataset
+from intent_parser import parse_intent
+from ranking import generate_ranking_answer
+from value_search import get_value_index
+
+
+@pytest.fixture(scope="module")
+def sep():
+    return get_dataset("Sep"), get_value_index("Sep")
+
+
+def ranking_answer(sep, question):
+    dataset, value_index = sep
+    intent = parse_intent(question, value_index)
+    return generate_ranking_answer(dataset.tables_1d, dataset.tables_2d, intent, "Sep")
+
+
+def test_one_filter_is_applied(sep):
+    answer = ranking_answer(sep, "top 5 industries by 2025 avg rate in New York")
+    assert answer.startswith("🏆 Top 5 industries by **2025 Avg Rate** for **New York**")
+
+
+def test_second_filter_is_not_dropped(sep):
+    # No table crosses industry, role and city
+    answer = ranking_answer(sep, "top 5 industries by 2025 avg rate for partners in New York")
+    assert answer.startswith("⚠️")
+    assert "`New York`" in answer and "`Partner`" in answer
+
+
+def test_superlative_is_singular(sep):
+    answer = ranking_answer(sep, "which city has the highest 2025 avg rate")
+    assert answer.startswith("🏆 Highest city by **2025 Avg Rate** (Sep): **")
+    answer = ranking_answer(sep, "lowest 2025 avg rate by years of experience")
+    assert answer.startswith("🏆 Lowest experience level by")
@@ -0,0 +1,27 @@
+import json
+
+import value_search
+from data_loader import get_dataset
+from value_search import DimensionValueIndex, get_value_index
+
+
+def test_truncated_index_is_rebuilt(monkeypatch):
+    dataset = get_dataset("Sep")
+    path = value_search._index_path(dataset.version, dataset.signature)
+    index = get_value_index("Sep")
+
+    # As left by a writer that died halfway
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(json.dumps(index.to_json())[:1000])
+    monkeypatch.setattr(value_search, "_VALUE_INDEXES", {})
+
+    rebuilt = get_value_index("Sep")
+    assert rebuilt.entries == index.entries
+    with open(path, encoding="utf-8") as fh:
+        assert DimensionValueIndex.from_json(json.load(fh)).entries == index.entries
+
+
+def test_acronyms_need_capitals_below_three_letters():
+    index = get_value_index("Sep")
+    assert index.find_values("2025 avg rate for IP")
+    assert not index.find_values("is there no data")
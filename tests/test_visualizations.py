@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from visualizations import MAX_CATEGORIES, MAX_SLICES, OTHER, plot_generic
+
+RATE = "2025 Avg Rate Sep"
+
+
+def cities(n):
+    return pd.DataFrame({
+        "Dimension Value": [f"City {i}" for i in range(n)],
+        RATE: np.arange(1, n + 1, dtype=np.float64) * 10,
+    })
+
+
+def slices(fig):
+    trace = fig.data[0]
+    return dict(zip(trace.labels, trace.values))
+
+
+def test_rate_donut_other_is_the_folded_total():
+    df = cities(30)
+    shown = slices(plot_generic(df, RATE, "donut"))
+
+    assert len(shown) == MAX_SLICES
+    kept = [v for k, v in shown.items() if k != OTHER]
+    assert shown[OTHER] == df[RATE].sum() - sum(kept)
+
+
+def test_rate_bar_other_stays_a_mean():
+    df = cities(MAX_CATEGORIES + 10)
+    trace = plot_generic(df, RATE, "bar").data[0]
+    bars = dict(zip(trace.x, trace.y))
+
+    folded = df[~df["Dimension Value"].isin([k for k in bars if k != OTHER])]
+    assert bars[OTHER] == folded[RATE].mean()
@@ -1,10 +1,8 @@
-import re
 from difflib import SequenceMatcher
+from fuzzy_match import normalize, MIN_SCORE, CONTAINMENT_SCORE
 from utils import resolve_measure_column
-
-def normalize(s: str) -> str:
-    return re.sub(r"[^a-z0-9]", "", s.lower())
-
+from table_index import get_index, filter_positions, take_rows
+from aggregates import get_cube
 
 def best_match(values_series, target_value):
     """
@@ -12,6 +10,9 @@ def best_match(values_series, target_value):
     Uses fuzzy matching to handle variations like:
     - "healthcare" vs "Health Care"
     - "tech" vs "Technology"
+    
+    The answer functions use ValueIndex.match, which gives the same result
+    over a prebuilt vocabulary; this is the plain per-value scan.
     """
     target = normalize(target_value)
     
@@ -27,22 +28,35 @@ def best_match(values_series, target_value):
         
         # Bonus: if target is contained in candidate (e.g., "health" in "healthcare")
         if target in candidate or candidate in target:
-            score = max(score, 0.85)
+            score = max(score, CONTAINMENT_SCORE)
         
         if score > best_score:
             best_score = score
             best_value = val_str
     
     # Accept matches with 60% or higher confidence (lowered from 70%)
-    if best_score >= 0.6:
+    if best_score >= MIN_SCORE:
         return best_value
     
     return None
 
 
-def generate_text_answer(df, intent, version):
+def filtered_mean(df, measure_col, positions, matched_filters):
+    """
+    Mean of a measure over the filtered rows. Looked up in the table's
+    AggregateCube when it covers the filters, computed from the rows otherwise.
+    """
+    mean = get_cube(df).mean(measure_col, matched_filters)
+    if mean is None:
+        mean = take_rows(df, positions)[measure_col].mean()
+    return mean
+
+
+def generate_text_answer(df, intent, version, value_index=None):
     """
-    Generate answer for 1D tables
+    Generate answer for 1D tables.
+    With a value_search.DimensionValueIndex, unmatched filters get
+    suggestions from every dimension of the version.
     """
     year = intent.get("year")
     metric = intent.get("metric")
@@ -77,32 +91,41 @@ def generate_text_answer(df, intent, version):
     if not dim_col:
         return f"⚠️ No dimension column found. Available columns: {list(df.columns)}"
     
-    filtered_df = df.copy()
+    # Filters narrow a set of row positions via the table's value index
+    index = get_index(df)
+    positions = None
     
     # Apply filter if provided - search in the DIMENSION column
+    matched_filters = {}
     applied_filters = []
     for dim_name, filter_val in filter_values.items():
         if filter_val:
-            matched_val = best_match(filtered_df[dim_col], filter_val)
+            matched_val = index.match(dim_col, filter_val, positions)
             
             if matched_val is None:
                 # Show available values to help user
-                available_values = filtered_df[dim_col].unique()[:5]  # Show first 5
-                return f"⚠️ No data found for `{filter_val}` in {dim_col}. Available values include: {list(available_values)}"
+                available_values = index.values(dim_col, positions)[:5]  # Show first 5
+                msg = f"⚠️ No data found for `{filter_val}` in {dim_col}. Available values include: {list(available_values)}"
+                if value_index is not None:
+                    suggestions = [f"{v} ({d})" for d, v, _ in value_index.search(filter_val, limit=3)]
+                    if suggestions:
+                        msg += f" Did you mean: {', '.join(suggestions)}?"
+                return msg
             
-            filtered_df = filtered_df[filtered_df[dim_col] == matched_val]
+            positions = filter_positions(index, dim_col, matched_val, positions)
+            matched_filters[dim_col] = matched_val
             applied_filters.append(f"{matched_val}")
     
-    if filtered_df.empty:
+    if positions is not None and len(positions) == 0:
         return "⚠️ No data found for the selected filters."
     
     # NOW get the measure column
-    measure_col = resolve_measure_column(filtered_df, year, metric, version)
+    measure_col = resolve_measure_column(df, year, metric, version)
     if not measure_col:
         available_measures = [c for c in df.columns if any(y in c for y in ["2023", "2024", "2025"])]
         return f"⚠️ Measure `{year} {metric}` not available. Available columns: {available_measures}"
     
-    value = round(filtered_df[measure_col].mean(), 2)
+    value = round(filtered_mean(df, measure_col, positions, matched_filters), 2)
     
     if applied_filters:
         filter_text = " × ".join(applied_filters)
@@ -159,35 +182,39 @@ def generate_2d_text_answer(df, intent, version):
     
     dim1_col, dim2_col = dim_cols[0], dim_cols[1]
     
-    filtered_df = df.copy()
+    index = get_index(df)
+    positions = None
+    matched_filters = {}
     applied_filters = []
     
     # Apply filters for both dimensions
     for key, val in filter_values.items():
         if val:
             # Try to match against dim1
-            matched = best_match(filtered_df[dim1_col], val)
+            matched = index.match(dim1_col, val, positions)
             if matched:
-                filtered_df = filtered_df[filtered_df[dim1_col] == matched]
+                positions = filter_positions(index, dim1_col, matched, positions)
+                matched_filters[dim1_col] = matched
                 applied_filters.append(matched)
                 continue
             
             # Try to match against dim2
-            matched = best_match(filtered_df[dim2_col], val)
+            matched = index.match(dim2_col, val, positions)
             if matched:
-                filtered_df = filtered_df[filtered_df[dim2_col] == matched]
+                positions = filter_positions(index, dim2_col, matched, positions)
+                matched_filters[dim2_col] = matched
                 applied_filters.append(matched)
     
-    if filtered_df.empty:
+    if positions is not None and len(positions) == 0:
         return "⚠️ No matching data found for the specified filters."
     
     # NOW get the measure column
-    measure_col = resolve_measure_column(filtered_df, year, metric, version)
+    measure_col = resolve_measure_column(df, year, metric, version)
     if not measure_col:
         available_measures = [c for c in df.columns if any(y in c for y in ["2023", "2024", "2025"])]
         return f"⚠️ `{year} {metric}` not available. Available columns: {available_measures}"
     
-    value = round(filtered_df[measure_col].mean(), 2)
+    value = round(filtered_mean(df, measure_col, positions, matched_filters), 2)
     
     if applied_filters:
         filter_text = " × ".join(applied_filters)
@@ -0,0 +1,160 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from aggregates import get_cube
+from table_index import FrameRegistry, dimension_columns, get_index, match_filters
+from utils import resolve_measure_column
+
+YEARS = ["2023", "2024", "2025"]
+
+
+class TableTrends:
+    """
+    Per-table (value x year) matrices of a metric: row i holds the mean of
+    the metric for the i-th value of a dimension column in each of YEARS.
+    Built from the AggregateCube once per (column, metric, version).
+    """
+
+    def __init__(self, df):
+        # Weak: the FrameRegistry holding this entry is keyed by a weakref to
+        # the same frame, and a strong one here would keep it alive forever
+        self._df = weakref.ref(df)
+        self._matrices = {}
+
+    @property
+    def df(self):
+        return self._df()
+
+    def year_columns(self, metric, version):
+        return [resolve_measure_column(self.df, y, metric, version) for y in YEARS]
+
+    def matrix(self, col, metric, version):
+        """
+        (values, matrix) for `col`; columns follow YEARS, NaN where a year
+        has no measure column or no data.
+        """
+        key = (col, metric, version)
+        if key not in self._matrices:
+            cube = get_cube(self.df)
+            values = get_index(self.df).values(col)
+            matrix = np.full((len(values), len(YEARS)), np.nan)
+            for j, measure in enumerate(self.year_columns(metric, version)):
+                if measure:
+                    matrix[:, j] = cube.marginal_means(col, measure)
+            self._matrices[key] = (values, matrix)
+        return self._matrices[key]
+
+    def series(self, metric, version, filters=None):
+        """
+        Means of the metric per year over the rows matching `filters`.
+        """
+        cube = get_cube(self.df)
+        return np.array([
+            cube.mean(measure, filters) if measure else np.nan
+            for measure in self.year_columns(metric, version)
+        ], dtype=np.float64)
+
+
+_TRENDS = FrameRegistry(TableTrends)
+
+
+def get_trends(df):
+    return _TRENDS.get(df)
+
+
+def growth(matrix):
+    """
+    Year-over-year % changes (n x years-1) and CAGR % (n) for every row
+    of a (value x year) matrix, in one pass. YoY is NaN where the base is
+    0 or missing; CAGR needs both end years above 0 (a 0 rate means no data).
+    """
+    m = np.atleast_2d(np.asarray(matrix, dtype=np.float64))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        yoy = np.where(m[:, :-1] != 0, (m[:, 1:] / m[:, :-1] - 1) * 100, np.nan)
+        ratio = np.where((m[:, 0] > 0) & (m[:, -1] > 0), m[:, -1] / m[:, 0], np.nan)
+        cagr = (ratio ** (1 / (m.shape[1] - 1)) - 1) * 100
+    return yoy, cagr
+
+
+def _pct(value):
+    if np.isnan(value):
+        return "n/a"
+    value = round(value, 2)
+    return f"{'+' if value >= 0 else ''}{value}%"
+
+
+def generate_trend_answer(df, intent, version, top=3):
+    """
+    Text answer for trend questions: the metric in every year for the
+    filtered slice, with year-over-year growth and CAGR.
+    Without filters it also lists the fastest growing values.
+    """
+    metric = intent.get("metric")
+    if not metric:
+        return "⚠️ Please specify a metric."
+
+    trends = get_trends(df)
+    if not any(trends.year_columns(metric, version)):
+        return f"⚠️ `{metric}` is not available for any year."
+
+    filters, unmatched = match_filters(df, intent.get("filter_values", {}))
+    if unmatched:
+        return f"⚠️ No data found for `{unmatched[0]}`."
+
+    series = trends.series(metric, version, filters)
+    yoy, cagr = growth(series)
+
+    subject = f"**{metric}** for **{' × '.join(filters.values())}**" if filters else f"**{metric}** overall average"
+    path = " → ".join(f"{y} **{round(v, 2)}**" for y, v in zip(YEARS, series))
+    changes = ", ".join(f"{_pct(g)} ({y})" for y, g in zip(YEARS[1:], yoy[0]))
+    answer = (
+        f"📈 {subject} ({version}): {path}. "
+        f"Year over year: {changes}; CAGR {YEARS[0]}–{YEARS[-1]}: **{_pct(cagr[0])}**."
+    )
+
+    if not filters:
+        col = dimension_columns(df)[0]
+        values, matrix = trends.matrix(col, metric, version)
+        _, cagrs = growth(matrix)
+        ranked = [i for i in np.argsort(-np.nan_to_num(cagrs, nan=-np.inf), kind="stable") if not np.isnan(cagrs[i])]
+        if ranked:
+            answer += "\n\nFastest growing: " + ", ".join(
+                f"{values[i]} ({_pct(cagrs[i])})" for i in ranked[:top]
+            )
+        slowest = ranked[top:][::-1][:top]
+        if slowest:
+            answer += "\n\nSlowest growing: " + ", ".join(
+                f"{values[i]} ({_pct(cagrs[i])})" for i in slowest
+            )
+
+    return answer
+
+
+def trend_frame(df, intent, version, max_lines=10):
+    """
+    Long-format (Series, Year, value) frame for a trend chart: one line for
+    the filtered slice, or one per value (the largest in the latest year,
+    at most max_lines) when there is no filter.
+    """
+    metric = intent.get("metric")
+    trends = get_trends(df)
+    filters, unmatched = match_filters(df, intent.get("filter_values", {}))
+    if unmatched:
+        raise ValueError(f"No data found for `{unmatched[0]}`")
+
+    if filters:
+        labels = [" × ".join(filters.values())]
+        matrix = trends.series(metric, version, filters)[None, :]
+    else:
+        values, matrix = trends.matrix(dimension_columns(df)[0], metric, version)
+        order = np.argsort(-np.nan_to_num(matrix[:, -1], nan=-np.inf), kind="stable")[:max_lines]
+        labels = [values[i] for i in order]
+        matrix = matrix[order]
+
+    return pd.DataFrame({
+        "Series": np.repeat(labels, len(YEARS)),
+        "Year": np.tile(YEARS, len(labels)),
+        metric: matrix.ravel(),
+    })
@@ -0,0 +1,301 @@
+import glob
+import json
+import os
+import re
+import tempfile
+import threading
+
+import numpy as np
+
+from data_loader import CACHE_DIR, get_dataset
+from fuzzy_match import normalize
+
+
+# Words that never start or end a value mention in a question
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "for", "in", "on", "at", "by", "to", "vs",
+    "what", "whats", "is", "are", "was", "how", "show", "me", "plot", "chart",
+    "graph", "rate", "rates", "avg", "average", "count", "counts", "matter",
+    "timekeeper", "year", "with", "between", "compare", "give", "tell",
+    "over", "time", "trend", "trends", "growth", "grow", "grew", "years",
+    "change", "changed", "did", "yoy", "cagr", "has", "have", "which", "who",
+    "top", "bottom", "highest", "lowest", "most", "least", "percentile", "among",
+}
+
+# Dimension names themselves are not values ("by city" is not "Atlantic City")
+DIMENSION_WORDS = {
+    "city", "cities", "country", "countries", "industry", "industries",
+    "role", "roles", "practice", "practice area", "practice areas",
+    "detailed practice area", "firm", "firm size", "matter type", "amlaw",
+    "amlaw bucket", "experience", "years of experience",
+}
+
+
+# Shorter acronyms ("IP", "NY") only count when written in capitals:
+# lower-case two-letter words are ordinary English ("no", "go", "am")
+MIN_LOWERCASE_ACRONYM = 3
+
+# Skipped when building leading-initial aliases ("M&A" for "Mergers, Acquisitions and ...")
+CONNECTORS = {"and", "or", "of", "the", "for", "in"}
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", str(text).lower())
+
+
+def trigrams(text):
+    """
+    pg_trgm-style trigrams: every word padded with two leading blanks
+    and one trailing blank.
+    """
+    grams = set()
+    for w in _words(text):
+        padded = f"  {w} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def join_initials(query):
+    """
+    "M&A" / "m&a" -> "MA", so initials joined by "&" read as one acronym.
+    """
+    return re.sub(r"\b([a-z])\s*&\s*([a-z])\b", lambda m: (m[1] + m[2]).upper(), query, flags=re.IGNORECASE)
+
+
+def acronym(text):
+    words = _words(text)
+    return "".join(w[0] for w in words) if len(words) > 1 else ""
+
+
+class DimensionValueIndex:
+    """
+    Trigram index over the values of every 1D dimension of a data version.
+    Maps normalized trigrams to (dimension, value) entries and ranks matches
+    by trigram similarity, with exact and acronym hits scored first,
+    then leading-initial aliases ("M&A"), and word-prefix hits
+    ("tech" -> "Tech and Telecom") close behind.
+    Acronyms shorter than MIN_LOWERCASE_ACRONYM letters match only text
+    written in capitals ("IP", not "ip").
+    """
+
+    def __init__(self, entries, postings=None):
+        # entries: list of (dimension, value)
+        self.entries = [tuple(e) for e in entries]
+        self._normalized = {}
+        self._acronyms = {}
+        # Leading-initial aliases, scored below real acronyms
+        self._initials = {}
+        self._words = []
+        sizes = []
+        for i, (dimension, value) in enumerate(self.entries):
+            self._words.append(_words(value))
+            self._normalized.setdefault(normalize(value), []).append(i)
+            abbr = acronym(value)
+            if len(abbr) > 1:
+                self._acronyms.setdefault(abbr, []).append(i)
+                # "NYC" for New York
+                if dimension == "city" and not abbr.endswith("c"):
+                    self._acronyms.setdefault(abbr + "c", []).append(i)
+            content = [w for w in _words(value) if w not in CONNECTORS]
+            if len(content) >= 3:
+                self._initials.setdefault(content[0][0] + content[1][0], []).append(i)
+            sizes.append(len(trigrams(value)))
+        self._sizes = np.array(sizes, dtype=np.int32)
+
+        if postings is None:
+            postings = {}
+            for i, (_, value) in enumerate(self.entries):
+                for g in trigrams(value):
+                    postings.setdefault(g, []).append(i)
+        self._postings = {g: np.asarray(ids, dtype=np.int32) for g, ids in postings.items()}
+
+    @classmethod
+    def from_tables(cls, tables_1d):
+        entries = []
+        for dimension, df in tables_1d.items():
+            for value in df["Dimension Value"].dropna().astype(str).unique():
+                entries.append((dimension, value))
+        return cls(entries)
+
+    def _is_acronym(self, text, key):
+        known = key in self._acronyms or key in self._initials
+        return known and (len(key) >= MIN_LOWERCASE_ACRONYM or text.strip().isupper())
+
+    def search(self, text, limit=5, dimensions=None, min_score=0.3):
+        """
+        Ranked [(dimension, value, score)] for a user-entered value,
+        in its original case.
+        """
+        scores = np.zeros(len(self.entries))
+
+        grams = trigrams(text)
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if hits:
+            shared = np.bincount(np.concatenate(hits), minlength=len(self.entries))
+            union = self._sizes + len(grams) - shared
+            scores = np.where(union > 0, shared / np.maximum(union, 1), 0.0)
+
+        key = normalize(text)
+        if len(key) >= 3:
+            for i, words in enumerate(self._words):
+                if any(w.startswith(key) for w in words):
+                    scores[i] = max(scores[i], 0.8)
+        if self._is_acronym(text, key):
+            # "IP" is Intellectual Property before Insurance Policies and Coverage
+            for i in self._initials.get(key, []):
+                scores[i] = max(scores[i], 0.85)
+            for i in self._acronyms.get(key, []):
+                scores[i] = max(scores[i], 0.9)
+        for i in self._normalized.get(key, []):
+            scores[i] = 1.0
+
+        if dimensions is not None:
+            allowed = np.array([d in dimensions for d, _ in self.entries], dtype=bool)
+            scores = np.where(allowed, scores, 0.0)
+
+        candidates = np.flatnonzero(scores >= min_score)
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")][:limit]
+        return [(*self.entries[i], float(scores[i])) for i in ranked]
+
+    def find_values(self, query, min_score=0.75, max_words=4):
+        """
+        Detects dimension values mentioned in a free-text question.
+        Returns {dimension: value}, longest and best-scoring mentions first.
+        """
+        return {
+            dimension: value
+            for dimension, value, _, _, _ in self.find_mentions(query, min_score, max_words)
+        }
+
+    def find_mentions(self, query, min_score=0.75, max_words=4):
+        """
+        Like find_values, but returns [(dimension, value, score, start, size)]
+        where start/size locate the mention in the question's words.
+        """
+        query = join_initials(query)
+        # Original case is kept for acronyms, see _is_acronym
+        original = re.findall(r"[A-Za-z0-9]+", query)
+        words = [w.lower() for w in original]
+        spans = []
+        for size in range(max_words, 0, -1):
+            for start in range(len(words) - size + 1):
+                span = words[start:start + size]
+                if span[0] in STOPWORDS or span[-1] in STOPWORDS:
+                    continue
+                if " ".join(span) in DIMENSION_WORDS:
+                    continue
+                text = " ".join(original[start:start + size])
+                if len(normalize(text)) < 3 and not self._is_acronym(text, normalize(text)):
+                    continue
+                variants = [text, text[:-1]] if text.lower().endswith("s") else [text]
+                for variant in variants:
+                    for dimension, value, score in self.search(variant, limit=1, min_score=min_score):
+                        spans.append((score, size, start, dimension, value))
+
+        found = []
+        dims = set()
+        used = set()
+        for score, size, start, dimension, value in sorted(spans, key=lambda s: (-s[0], -s[1], s[2])):
+            covered = set(range(start, start + size))
+            if covered & used or dimension in dims:
+                continue
+            found.append((dimension, value, score, start, size))
+            dims.add(dimension)
+            used |= covered
+
+        return found
+
+    def mention_spans(self, query, min_score=0.75, max_words=4):
+        """
+        Like find_mentions, but returns [(dimension, value, begin, end)]
+        where begin/end are character offsets in join_initials(query).
+        """
+        query = join_initials(query)
+        tokens = list(re.finditer(r"[A-Za-z0-9]+", query))
+        return [
+            (dimension, value, tokens[start].start(), tokens[start + size - 1].end())
+            for dimension, value, _, start, size in self.find_mentions(query, min_score, max_words)
+        ]
+
+    def to_json(self):
+        return {
+            "entries": [list(e) for e in self.entries],
+            "postings": {g: ids.tolist() for g, ids in self._postings.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["entries"], data["postings"])
+
+
+# -------------------------------------------------
+# Per-version registry, persisted next to the table cache
+# -------------------------------------------------
+_VALUE_INDEXES = {}
+_VALUE_INDEXES_LOCK = threading.Lock()
+
+
+def _index_path(version, signature):
+    return os.path.join(CACHE_DIR, version, f"value_index.{signature}.json")
+
+
+def _load_index(path):
+    """
+    The index saved at `path`, or None when it is missing or unreadable
+    (e.g. cut short by a crash).
+    """
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return DimensionValueIndex.from_json(json.load(fh))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _save_index(index, path):
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    for old in glob.glob(os.path.join(glob.escape(folder), "value_index.*.json")):
+        if old != path:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                # Another writer got there first
+                pass
+
+    # Written aside and moved in, so readers in other processes never see half a file
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix="value_index.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(index.to_json(), fh)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def get_value_index(version: str):
+    """
+    DimensionValueIndex for a version, built once per data signature.
+    A saved copy that cannot be read is rebuilt and saved again.
+    """
+    dataset = get_dataset(version)
+    key = (dataset.version, dataset.signature)
+
+    with _VALUE_INDEXES_LOCK:
+        if key in _VALUE_INDEXES:
+            return _VALUE_INDEXES[key]
+
+        path = _index_path(*key)
+        index = _load_index(path)
+        if index is None:
+            index = DimensionValueIndex.from_tables(dataset.tables_1d)
+            try:
+                _save_index(index, path)
+            except OSError:
+                pass
+
+        for old in [k for k in _VALUE_INDEXES if k[0] == dataset.version]:
+            del _VALUE_INDEXES[old]
+        _VALUE_INDEXES[key] = index
+        return index
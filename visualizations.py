@@ -1,4 +1,73 @@
 import plotly.express as px
+import plotly.io as pio
+
+from data_loader import densify
+from figure_cache import FIGURE_CACHE, figure_key
+
+# -------------------------------------------------
+# Render budget: bounds what Plotly serializes, whatever the table size
+# -------------------------------------------------
+MAX_CATEGORIES = 40          # x-axis categories of bar charts
+MAX_LINE_CATEGORIES = 500    # x-axis categories of line charts
+MAX_SERIES = 12              # colors / legend entries
+MAX_SLICES = 12              # donut slices
+MAX_HEATMAP_AXIS = 60        # rows and columns of a heatmap
+WEBGL_THRESHOLD = 1000       # line points above which Scattergl is used
+OTHER = "Other"
+
+
+def _agg(measure_col):
+    # Counts add up; rates are averaged
+    return "sum" if "Count" in measure_col else "mean"
+
+
+# Slices are shares of their total, so "Other" must hold the sum of what it
+# folds, rates included: a mean would be drawn as one more category
+DONUT_AGG = "sum"
+
+
+def drop_empty_rows(df, measure_col):
+    """
+    Rows whose measure is 0 or missing add nothing to a chart.
+    """
+    values = df[measure_col]
+    return df[values.notna() & (values != 0)]
+
+
+def cap_categories(df, col, measure_col, limit, agg=None):
+    """
+    Keeps the `limit - 1` largest values of `col` (by the measure, combined
+    with `agg`, default _agg) and folds the rest into an "Other" bucket.
+    Returns (df, capped).
+    """
+    if df[col].nunique() <= limit:
+        return df, False
+
+    totals = df.groupby(col, sort=False)[measure_col].agg(agg or _agg(measure_col))
+    keep = totals.nlargest(limit - 1).index
+    out = df.copy()
+    out[col] = out[col].where(out[col].isin(keep), OTHER)
+    return out, True
+
+
+def apply_render_budget(df, dims, measure_col, limits, agg=None):
+    """
+    Drops empty rows, caps each dimension in `dims` to its limit and
+    aggregates the rows folded into "Other" with `agg` (default _agg).
+    """
+    agg = agg or _agg(measure_col)
+    df = drop_empty_rows(df, measure_col)
+    capped = False
+    for col, limit in zip(dims, limits):
+        df, was_capped = cap_categories(df, col, measure_col, limit, agg)
+        capped = capped or was_capped
+    if capped:
+        df = df.groupby(list(dims), sort=False, as_index=False)[measure_col].agg(agg)
+    return df
+
+
+def _render_mode(df):
+    return "webgl" if len(df) > WEBGL_THRESHOLD else "auto"
 
 
 # -------------------------------------------------
@@ -52,6 +121,9 @@ def plot_generic(df, measure_col, chart_type):
     - heatmap (2D)
     """
 
+    # 2D tables may be in the sparse/categorical layout
+    df = densify(df)
+
     dims = get_dimension_columns(df, measure_col)
     
     if len(dims) == 0:
@@ -63,6 +135,7 @@ def plot_generic(df, measure_col, chart_type):
     # ---------------- 1D CHARTS ----------------
     if len(dims) == 1:
         if chart_type == "bar":
+            df = apply_render_budget(df, dims, measure_col, [MAX_CATEGORIES])
             fig = px.bar(
                 df,
                 x=dims[0],
@@ -75,11 +148,13 @@ def plot_generic(df, measure_col, chart_type):
             return fig
             
         elif chart_type == "line":
+            df = apply_render_budget(df, dims, measure_col, [MAX_LINE_CATEGORIES])
             fig = px.line(
                 df,
                 x=dims[0],
                 y=measure_col,
                 markers=True,
+                render_mode=_render_mode(df),
                 title=f"{measure_name} Trend"
             )
             fig.update_layout(xaxis_title=dims[0].replace("Dimension Value", "Category"))
@@ -87,6 +162,7 @@ def plot_generic(df, measure_col, chart_type):
             return fig
             
         elif chart_type == "donut":
+            df = apply_render_budget(df, dims, measure_col, [MAX_SLICES], DONUT_AGG)
             return px.pie(
                 df,
                 names=dims[0],
@@ -104,7 +180,7 @@ def plot_generic(df, measure_col, chart_type):
         dim2_label = dims[1].replace("Dimension2 Value", "Dimension 2").replace("Dimension Value", "Category")
         
         if chart_type == "bar":
-            
+            df = apply_render_budget(df, dims, measure_col, [MAX_CATEGORIES, MAX_SERIES])
             fig = px.bar(
                 df,
                 x=dims[0],
@@ -120,6 +196,7 @@ def plot_generic(df, measure_col, chart_type):
             return fig
         
         elif chart_type == "stacked_bar":
+            df = apply_render_budget(df, dims, measure_col, [MAX_CATEGORIES, MAX_SERIES])
             fig = px.bar(
                 df,
                 x=dims[0],
@@ -135,6 +212,7 @@ def plot_generic(df, measure_col, chart_type):
             return fig
         
         elif chart_type == "grouped_bar":
+            df = apply_render_budget(df, dims, measure_col, [MAX_CATEGORIES, MAX_SERIES])
             fig = px.bar(
                 df,
                 x=dims[0],
@@ -150,12 +228,14 @@ def plot_generic(df, measure_col, chart_type):
             return fig
         
         elif chart_type == "line":
+            df = apply_render_budget(df, dims, measure_col, [MAX_LINE_CATEGORIES, MAX_SERIES])
             fig = px.line(
                 df,
                 x=dims[0],
                 y=measure_col,
                 color=dims[1],
                 markers=True,
+                render_mode=_render_mode(df),
                 title=f"{measure_name} Trend"
             )
             fig.update_layout(xaxis_title=dim1_label)
@@ -164,6 +244,8 @@ def plot_generic(df, measure_col, chart_type):
             return fig
         
         elif chart_type == "heatmap":
+            # Downsample to the largest rows / columns before pivoting
+            df = apply_render_budget(df, dims, measure_col, [MAX_HEATMAP_AXIS, MAX_HEATMAP_AXIS])
             # Create pivot table for heatmap
             pivot_df = df.pivot_table(
                 index=dims[1],
@@ -183,6 +265,7 @@ def plot_generic(df, measure_col, chart_type):
         elif chart_type == "donut":
             
             grouped = df.groupby(dims[0])[measure_col].sum().reset_index()
+            grouped = apply_render_budget(grouped, dims[:1], measure_col, [MAX_SLICES], DONUT_AGG)
             return px.pie(
                 grouped,
                 names=dims[0],
@@ -198,4 +281,66 @@ def plot_generic(df, measure_col, chart_type):
         raise ValueError(
             f"Expected 1 or 2 dimensions, found {len(dims)}. "
             f"Available dimensions: {dims}"
-        )
\ No newline at end of file
+        )
+
+
+# -------------------------------------------------
+# Multi-year trends
+# -------------------------------------------------
+def plot_trend(trend_df, metric):
+    """
+    Line chart of a metric across years, one line per series
+    (see trends.trend_frame).
+    """
+    fig = px.line(
+        trend_df,
+        x="Year",
+        y=metric,
+        color="Series",
+        markers=True,
+        title=f"{metric} Trend"
+    )
+    fig.update_layout(xaxis_title="Year")
+    fig.update_layout(yaxis_title=metric)
+    fig.update_layout(legend_title="")
+    return fig
+
+
+# -------------------------------------------------
+# Rankings
+# -------------------------------------------------
+def plot_ranking(ranking_df, measure_col):
+    """
+    Horizontal bar chart of a ranking, best value on top
+    (see ranking.ranking_frame).
+    """
+    label = ranking_df.columns[0]
+    measure_name = measure_col.replace(" Jun", "").replace(" Sep", "")
+    fig = px.bar(
+        ranking_df,
+        x=measure_col,
+        y=label,
+        orientation="h",
+        text_auto=True,
+        title=f"{measure_name} Ranking"
+    )
+    fig.update_layout(yaxis=dict(autorange="reversed", title=label))
+    fig.update_layout(xaxis_title=measure_name)
+    return fig
+
+
+# -------------------------------------------------
+# Cached charts
+# -------------------------------------------------
+def plot_cached(df, measure_col, chart_type, version, table, cache=FIGURE_CACHE):
+    """
+    plot_generic through the shared figure cache. Returns (key, figure);
+    on a hit the figure is rebuilt from its stored JSON, without pandas.
+    """
+    key = figure_key(df, version, table, measure_col, chart_type)
+    payload = cache.get(key)
+    if payload is None:
+        fig = plot_generic(df, measure_col, chart_type)
+        cache.put(key, fig.to_json())
+        return key, fig
+    return key, pio.from_json(payload)
@@ -0,0 +1,236 @@
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from array import array
+from xml.parsers import expat
+
+import numpy as np
+import pandas as pd
+
+
+_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# expat reports namespaced tags as "<uri> <local name>"
+_ROW = f"{_NS} row"
+_CELL = f"{_NS} c"
+_VALUE = f"{_NS} v"
+_TEXT = f"{_NS} t"
+
+# Strings pd.read_excel turns into NaN by default
+NA_VALUES = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+    "n/a", "nan", "null",
+}
+
+_CHUNK_SIZE = 1 << 20
+_COLUMN_CACHE = {}
+
+
+def _column_index(ref):
+    letters = ref.rstrip("0123456789")
+    idx = _COLUMN_CACHE.get(letters)
+    if idx is None:
+        idx = 0
+        for ch in letters:
+            idx = idx * 26 + (ord(ch) - 64)
+        idx -= 1
+        _COLUMN_CACHE[letters] = idx
+    return idx
+
+
+def _first_sheet_path(zf):
+    """
+    Resolves the first worksheet through workbook.xml and its relationships.
+    """
+    ns = "{" + _NS + "}"
+    try:
+        workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+        rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        sheet = workbook.find(f"{ns}sheets/{ns}sheet")
+        rid = sheet.get(f"{_REL_NS}id")
+        for rel in rels.iter(f"{_PKG_REL_NS}Relationship"):
+            if rel.get("Id") == rid:
+                target = rel.get("Target")
+                if target.startswith("/"):
+                    return target.lstrip("/")
+                return posixpath.normpath(posixpath.join("xl", target))
+    except (KeyError, AttributeError, ET.ParseError):
+        pass
+    return "xl/worksheets/sheet1.xml"
+
+
+def _shared_strings(zf):
+    ns = "{" + _NS + "}"
+    try:
+        root = ET.fromstring(zf.read("xl/sharedStrings.xml"))
+    except KeyError:
+        return []
+    return ["".join(t.text or "" for t in si.iter(f"{ns}t")) for si in root.iter(f"{ns}si")]
+
+
+class _Column:
+    """
+    Accumulates one column: a float64 array while every cell is numeric,
+    a plain list once text shows up. Empty cells are NaN / None.
+    """
+
+    def __init__(self):
+        self.numbers = array("d")
+        self.objects = None
+        self.all_int = True
+        self.has_missing = False
+
+    def _to_objects(self):
+        self.objects = [None if np.isnan(v) else (int(v) if self.all_int else v) for v in self.numbers]
+
+    def add_number(self, text):
+        if self.objects is not None:
+            self.objects.append(int(text) if _is_int(text) else float(text))
+            return
+        if self.all_int and not _is_int(text):
+            self.all_int = False
+        self.numbers.append(float(text))
+
+    def add_text(self, text):
+        if text in NA_VALUES:
+            self.add_missing()
+            return
+        if self.objects is None:
+            self._to_objects()
+        self.objects.append(text)
+
+    def add_missing(self):
+        self.has_missing = True
+        if self.objects is None:
+            self.numbers.append(np.nan)
+        else:
+            self.objects.append(None)
+
+    def finish(self):
+        if self.objects is not None:
+            # Let pandas infer the dtype, as read_excel does
+            return self.objects
+        values = np.frombuffer(self.numbers, dtype=np.float64).copy()
+        if self.all_int and not self.has_missing:
+            return values.astype(np.int64)
+        return values
+
+
+def _is_int(text):
+    return text.lstrip("-").isdigit()
+
+
+class _SheetParser:
+    """
+    expat handlers for one worksheet. Only cells in kept columns are
+    buffered; everything else is skipped as it streams past.
+    """
+
+    def __init__(self, shared, wanted):
+        self.shared = shared
+        self.wanted = wanted
+        self.header = None
+        self.keep = {}          # column index -> _Column
+        self.n_rows = 0
+        self.cells = {}
+        self.col = 0
+        self.kind = "n"
+        self.buf = None         # text of the current cell, None when skipped
+        self.capture = False    # inside <v> or <t> of a kept cell
+
+    def start(self, name, attrs):
+        if name == _CELL:
+            ref = attrs.get("r")
+            self.col = _column_index(ref) if ref else self.col + 1
+            self.kind = attrs.get("t", "n")
+            keep = self.header is None or self.col in self.keep
+            self.buf = [] if keep else None
+        elif name == _VALUE or name == _TEXT:
+            self.capture = self.buf is not None
+        elif name == _ROW:
+            self.cells = {}
+            self.col = -1
+
+    def end(self, name):
+        if name == _CELL:
+            if self.buf:
+                self.cells[self.col] = (self.kind, "".join(self.buf))
+            self.buf = None
+        elif name == _VALUE or name == _TEXT:
+            self.capture = False
+        elif name == _ROW:
+            self._finish_row()
+
+    def chars(self, data):
+        if self.capture:
+            self.buf.append(data)
+
+    def _finish_row(self):
+        if self.header is None:
+            self.header = {i: self._text(kind, raw) for i, (kind, raw) in self.cells.items()}
+            for i, name in self.header.items():
+                if self.wanted is None or str(name).strip() in self.wanted:
+                    self.keep[i] = _Column()
+            return
+
+        for i, col in self.keep.items():
+            cell = self.cells.get(i)
+            if cell is None:
+                col.add_missing()
+                continue
+
+            kind, raw = cell
+            if kind == "n":
+                col.add_number(raw)
+            elif kind == "b":
+                col.add_number("1" if raw == "1" else "0")
+            elif kind == "e":
+                col.add_missing()
+            else:
+                col.add_text(self._text(kind, raw))
+        self.n_rows += 1
+
+    def _text(self, kind, raw):
+        return self.shared[int(raw)] if kind == "s" else raw
+
+
+def read_xlsx(path, usecols=None):
+    """
+    Streaming replacement for pd.read_excel on the first sheet of a workbook.
+
+    Feeds the worksheet XML to expat in 1 MB chunks and keeps only the
+    columns named in `usecols` (header names, compared after stripping;
+    None keeps all). Numeric columns are built as NumPy arrays (int64 when
+    every cell is a whole number, float64 otherwise); empty cells and the
+    default NA strings become NaN like in pd.read_excel. The first row is
+    the header.
+    """
+    wanted = None if usecols is None else {str(c).strip() for c in usecols}
+
+    with zipfile.ZipFile(path) as zf:
+        sheet = _SheetParser(_shared_strings(zf), wanted)
+
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.buffer_text = True
+        parser.StartElementHandler = sheet.start
+        parser.EndElementHandler = sheet.end
+        parser.CharacterDataHandler = sheet.chars
+
+        with zf.open(_first_sheet_path(zf)) as fh:
+            while True:
+                chunk = fh.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                parser.Parse(chunk, False)
+            parser.Parse(b"", True)
+
+    if sheet.header is None:
+        return pd.DataFrame()
+
+    return pd.DataFrame(
+        {sheet.header[i]: sheet.keep[i].finish() for i in sorted(sheet.keep)},
+        index=pd.RangeIndex(sheet.n_rows),
+    )